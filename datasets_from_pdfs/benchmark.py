@@ -0,0 +1,765 @@
+#     datasets-from-pdfs - Convert single or mass PDFs to datasets
+#     Copyright (C) 2021  Daniel Whitten - danieljwhitten@gmail.com
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os, re, sys, time, argparse, statistics, tempfile, random, json, platform
+import fitz, unidecode
+from textblob.en import Spelling
+from textblob.exceptions import MissingCorpusError
+from .readpdf import (
+    Arguments, ReadPDF, File, Page, OCREngine, ProcessingTools, SpellingIndex, 
+    FrequencyReport, TextNormalizer, CSVWriter, ProgressOutput
+)
+
+""" Timing comparisons between the stages of datasets-from-pdfs and the code paths they replace """
+
+class Benchmark:
+
+    def __init__(self, user_args=None):
+        self.arguments(user_args)
+
+    def arguments(self, user_args):
+        parser = argparse.ArgumentParser(
+            description=("Time the slower stages of datasets-from-pdfs. Run from the "
+            "datasets_from_pdfs folder, so that the options folder can be found.")
+        )
+        benchmarks = parser.add_subparsers(dest="benchmark", metavar="benchmark")
+        benchmarks.required = True
+
+        ocr = benchmarks.add_parser("ocr",
+            help=("Compare handing page images to Tesseract OCR in memory "
+            "with saving them as temporary PNG files.")
+        )
+        ocr.add_argument("filepath",
+            help="The path to a PDF file with pages that need OCR."
+        )
+        ocr.add_argument("-p", "--pages",
+            help="The number of pages to OCR, starting from the first page.",
+            type=int,
+            default=10
+        )
+
+        dpi = benchmarks.add_parser("dpi",
+            help=("Compare OCR at a chosen resolution, as set with the 'OCR DPI' option, "
+            "with OCR at the fixed zoom of 3.2.")
+        )
+        dpi.add_argument("filepath",
+            help="The path to a PDF file with pages that need OCR."
+        )
+        dpi.add_argument("-p", "--pages",
+            help="The number of pages to OCR, starting from the first page.",
+            type=int,
+            default=10
+        )
+        dpi.add_argument("-d", "--dpi",
+            help="The resolution to compare with the fixed zoom. Default is 300.",
+            type=int,
+            default=300
+        )
+
+        spelling = benchmarks.add_parser("spelling",
+            help=("Compare autocorrect suggestions from the spelling index with "
+            "textblob's Spelling model, loaded for every page as older versions did.")
+        )
+        spelling.add_argument("filepath",
+            help="The path to a PDF file with a text layer, or with text from OCR."
+        )
+        spelling.add_argument("-p", "--pages",
+            help="The number of pages to check, starting from the first page.",
+            type=int,
+            default=10
+        )
+        spelling.add_argument("-n", "--noise",
+            help=("The share of words (0 to 1) to misspell with one to three random "
+            "edits, to test text with more errors than the file has."),
+            type=float,
+            default=0
+        )
+
+        pos = benchmarks.add_parser("pos",
+            help=("Show how the time to count words and tags for a POS frequency report "
+            "grows with the number of tokens, against the counting it replaces.")
+        )
+        pos.add_argument("-n", "--tokens",
+            help="The largest number of tokens to count. Default is 100000.",
+            type=int,
+            default=100000
+        )
+        pos.add_argument("-ol", "--oldLimit",
+            help=("The largest number of tokens to count the old way, which takes "
+            "quadratic time. Default is 10000."),
+            type=int,
+            default=10000
+        )
+
+        clean = benchmarks.add_parser("clean",
+            help=("Compare the text normalizer with the separate passes of Page.clean_text "
+            "it replaces, and check that both give the same text.")
+        )
+        clean.add_argument("filepath",
+            help="The path to a PDF file with a text layer."
+        )
+        clean.add_argument("-p", "--pages",
+            help="The number of pages to clean, starting from the first page.",
+            type=int,
+            default=100
+        )
+        clean.add_argument("-r", "--random",
+            help=("The number of random strings of awkward characters to check as well, "
+            "for differences that the file does not contain. Default is 10000."),
+            type=int,
+            default=10000
+        )
+
+        suite = benchmarks.add_parser("suite",
+            help=("Time every stage of reading and processing on a synthetic corpus, "
+            "made the same way on every run, and save the timings as JSON.")
+        )
+        suite.add_argument("-o", "--output",
+            help="The JSON file to save the timings to. Default is benchmark-suite.json.",
+            default="benchmark-suite.json",
+            metavar="Output File"
+        )
+        suite.add_argument("-c", "--compare",
+            help=("The JSON file of an earlier run, to compare each stage with. "
+            "Stages that are slower by more than the threshold are marked."),
+            metavar="Earlier Output File"
+        )
+        suite.add_argument("-t", "--threshold",
+            help="The share (0 to 1) by which a stage can be slower before it is marked. Default is 0.1.",
+            type=float,
+            default=0.1
+        )
+        suite.add_argument("-p", "--pages",
+            help="The number of text, scanned and mixed pages to time each stage on. Default is 20.",
+            type=int,
+            default=20
+        )
+        suite.add_argument("-s", "--sizes",
+            help=("The page counts of the text documents to time reading on, "
+            "to see how it scales with the length of a document. Default is 1 10 100 1000 10000."),
+            type=int,
+            nargs="+",
+            default=[1, 10, 100, 1000, 10000]
+        )
+        suite.add_argument("-f", "--files",
+            help="The number of files in the folder that discovery is timed on. Default is 200.",
+            type=int,
+            default=200
+        )
+        suite.add_argument("-r", "--repeat",
+            help="The number of times to time each stage. The fastest time is kept. Default is 3.",
+            type=int,
+            default=3
+        )
+        suite.add_argument("-d", "--directory",
+            help=("A folder to make the corpus in, which is kept afterwards. "
+            "By default it is made in a temporary folder and removed."),
+            metavar="Corpus Folder"
+        )
+
+        self.args = parser.parse_args(user_args)
+
+    def run(self):
+        benchmarks = {
+            "ocr" : self.ocr,
+            "dpi" : self.dpi,
+            "spelling" : self.spelling,
+            "pos" : self.pos,
+            "clean" : self.clean,
+            "suite" : self.suite,
+        }
+        benchmarks[self.args.benchmark]()
+
+    def find_tesseract(self):
+        try:
+            ReadPDF.find_tesseract(None)
+        except IOError as err:
+            print(err.strerror)
+            sys.exit(1)
+
+    def ocr(self):
+        self.find_tesseract()
+        pdf = fitz.open(self.args.filepath)
+        engine = OCREngine()
+        pages = range(min(self.args.pages, len(pdf)))
+        timings = {"file" : list(), "memory" : list()}
+        differences = 0
+        print("Timing OCR of {} page{} from {}".format(
+            len(pages),
+            "s" if len(pages) > 1 else "",
+            self.args.filepath
+        ))
+        for i in pages:
+            page = pdf[i]
+
+            # Render, save as PNG, and have Tesseract read the file back
+            time_start = time.perf_counter()
+            with tempfile.TemporaryDirectory() as temp_dir:
+                pix = engine.render(page)
+                img = os.path.join(temp_dir, "page-{}.png".format(page.number))
+                pix.writePNG(img)
+                time_image = time.perf_counter()
+                text_file = engine.recognise_file(img)
+            time_end = time.perf_counter()
+            timings["file"].append((time_image - time_start, time_end - time_image))
+
+            # Render and pipe the uncompressed image to Tesseract
+            time_start = time.perf_counter()
+            pix = engine.render(page)
+            image_data = pix.getImageData("pnm")
+            time_image = time.perf_counter()
+            text_memory = engine.recognise(image_data, pix.xres)
+            time_end = time.perf_counter()
+            timings["memory"].append((time_image - time_start, time_end - time_image))
+
+            if text_file.split() != text_memory.split():
+                differences += 1
+
+        print("{:<8}{:>16}{:>16}{:>16}".format("Route", "Image (s/page)", "OCR (s/page)", "Total (s/page)"))
+        for route, times in timings.items():
+            image = statistics.mean(t[0] for t in times)
+            ocr = statistics.mean(t[1] for t in times)
+            print("{:<8}{:>16.4f}{:>16.4f}{:>16.4f}".format(route, image, ocr, image + ocr))
+        saved = (
+            statistics.mean(sum(t) for t in timings["file"])
+            - statistics.mean(sum(t) for t in timings["memory"])
+        )
+        print("The in-memory route saved {:.4f} seconds per page.".format(saved))
+        print("{} page{} had different OCR text between the two routes.".format(
+            differences,
+            "s" if differences != 1 else ""
+        ))
+
+    def dpi(self):
+        self.find_tesseract()
+        pdf = fitz.open(self.args.filepath)
+        engines = {
+            "fixed" : OCREngine(),
+            "{} dpi".format(self.args.dpi) : OCREngine(ocr_dpi=self.args.dpi)
+        }
+        pages = range(min(self.args.pages, len(pdf)))
+        timings = {route : list() for route in engines}
+        words = {route : list() for route in engines}
+        print("Timing OCR of {} page{} from {}".format(
+            len(pages),
+            "s" if len(pages) > 1 else "",
+            self.args.filepath
+        ))
+        for i in pages:
+            page = pdf[i]
+            for route, engine in engines.items():
+                time_start = time.perf_counter()
+                pix = engine.render(page)
+                time_image = time.perf_counter()
+                text = engine.recognise(pix.getImageData("pnm"), pix.xres)
+                time_end = time.perf_counter()
+                timings[route].append((time_image - time_start, time_end - time_image, pix.width))
+                words[route].append(len(text.split()))
+
+        print("{:<10}{:>12}{:>16}{:>16}{:>16}{:>12}".format(
+            "Route", "Width (px)", "Image (s/page)", "OCR (s/page)", "Total (s/page)", "Words"
+        ))
+        for route, times in timings.items():
+            image = statistics.mean(t[0] for t in times)
+            ocr = statistics.mean(t[1] for t in times)
+            width = statistics.mean(t[2] for t in times)
+            print("{:<10}{:>12.0f}{:>16.4f}{:>16.4f}{:>16.4f}{:>12}".format(
+                route, width, image, ocr, image + ocr, sum(words[route])
+            ))
+        fixed, chosen = timings.values()
+        saved = statistics.mean(sum(t[:2]) for t in fixed) - statistics.mean(sum(t[:2]) for t in chosen)
+        words_fixed, words_chosen = [sum(counts) for counts in words.values()]
+        print("The chosen resolution saved {:.4f} seconds per page and found {:+d} words.".format(
+            saved,
+            words_chosen - words_fixed
+        ))
+        differences = sum(1 for fixed, chosen in zip(*words.values()) if fixed != chosen)
+        print("{} page{} had a different number of words between the two routes.".format(
+            differences,
+            "s" if differences != 1 else ""
+        ))
+
+    def spelling(self):
+        pdf = fitz.open(self.args.filepath)
+        random.seed(0)
+        pages = [
+            [
+                self._misspell(word) if random.random() < self.args.noise else word
+                for word in re.findall(r"[a-z]+", pdf[i].getText().lower())
+            ]
+            for i in range(min(self.args.pages, len(pdf)))
+        ]
+        word_count = sum(len(words) for words in pages)
+        path = SpellingIndex.path_default()
+        print("Timing suggestions for {} words on {} page{} from {}".format(
+            word_count,
+            len(pages),
+            "s" if len(pages) > 1 else "",
+            self.args.filepath
+        ))
+
+        # A new Spelling model for every page, as ProcessingTools.autocorrect used to do
+        suggestions_old = list()
+        time_load = time_suggest = 0.0
+        for words in pages:
+            time_start = time.perf_counter()
+            spelling = Spelling(path=path)
+            spelling.load()
+            time_loaded = time.perf_counter()
+            suggestions_old.extend(spelling.suggest(word)[0] for word in words)
+            time_end = time.perf_counter()
+            time_load += time_loaded - time_start
+            time_suggest += time_end - time_loaded
+        timings = {"textblob" : (time_load, time_suggest)}
+
+        suggestions_new = list()
+        time_load = time_suggest = 0.0
+        for words in pages:
+            time_start = time.perf_counter()
+            index = SpellingIndex.open(path)
+            time_loaded = time.perf_counter()
+            suggestions_new.extend(index.suggest(word)[0] for word in words)
+            time_end = time.perf_counter()
+            time_load += time_loaded - time_start
+            time_suggest += time_end - time_loaded
+        timings["index"] = (time_load, time_suggest)
+
+        print("{:<10}{:>12}{:>14}{:>12}{:>14}".format(
+            "Model", "Load (s)", "Suggest (s)", "Total (s)", "Words/s"
+        ))
+        for model, (load, suggest) in timings.items():
+            print("{:<10}{:>12.3f}{:>14.3f}{:>12.3f}{:>14.0f}".format(
+                model, 
+                load, 
+                suggest, 
+                load + suggest,
+                word_count / (load + suggest) if load + suggest > 0 else 0
+            ))
+        differences = sum(1 for old, new in zip(suggestions_old, suggestions_new) if old != new)
+        print("{} word{} had a different suggestion or confidence between the two models.".format(
+            differences,
+            "s" if differences != 1 else ""
+        ))
+
+    def _misspell(self, word):
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        for _ in range(random.randint(1, 3)):
+            i = random.randrange(len(word) + 1)
+            edit = random.choice(["delete", "insert", "replace"])
+            if edit == "delete" and len(word) > 1:
+                word = word[:i] + word[i + 1:]
+            elif edit == "insert":
+                word = word[:i] + random.choice(letters) + word[i:]
+            else:
+                word = word[:i] + random.choice(letters) + word[i + 1:]
+        return word
+
+    def pos(self):
+        random.seed(0)
+        # Tagged words with a long tail of rare words, like real text
+        tags = ["NN", "VB", "JJ", "RB", "DT", "IN", "PRP"]
+        vocabulary = [
+            ("word{}".format(i), tags[i % len(tags)]) 
+            for i in range(max(self.args.tokens // 10, 1))
+        ]
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        tokens = random.choices(vocabulary, weights, k=self.args.tokens)
+        sizes = list()
+        size = self.args.tokens
+        while size >= 1000:
+            sizes.insert(0, size)
+            size //= 2
+
+        print("{:>10}{:>14}{:>16}{:>14}{:>16}".format(
+            "Tokens", "Count (s)", "us/token", "Old (s)", "us/token"
+        ))
+        for size in sizes:
+            time_start = time.perf_counter()
+            FrequencyReport._count_POS(tokens[:size])
+            time_new = time.perf_counter() - time_start
+            line = "{:>10}{:>14.4f}{:>16.3f}".format(size, time_new, time_new / size * 1e6)
+            if size <= self.args.oldLimit:
+                time_start = time.perf_counter()
+                self._count_POS_old(list(tokens[:size]))
+                time_old = time.perf_counter() - time_start
+                line += "{:>14.4f}{:>16.3f}".format(time_old, time_old / size * 1e6)
+            print(line)
+        print(("The time per token stays flat as the input grows when counting "
+            "takes linear time, and grows with the input when it is quadratic."))
+
+    # The comprehension report_POS used before, which also dropped and miscounted pairs
+    def _count_POS_old(self, tags):
+        return {
+            tags.pop(tags.index(tag)) : tags.count(tag) 
+            for tag in tags
+        }
+
+    def clean(self):
+        pdf = fitz.open(self.args.filepath)
+        pages = [pdf[i].getText() for i in range(min(self.args.pages, len(pdf)))]
+        print("Timing text cleaning of {} page{} from {}".format(
+            len(pages),
+            "s" if len(pages) > 1 else "",
+            self.args.filepath
+        ))
+        timings = dict()
+        results = dict()
+        for name, clean_text in [("old", self._clean_text_old), ("new", TextNormalizer.normalize)]:
+            time_start = time.perf_counter()
+            results[name] = [clean_text(text) for text in pages]
+            timings[name] = time.perf_counter() - time_start
+        print("{:<8}{:>12}{:>14}".format("Passes", "Total (s)", "ms/page"))
+        for name, total in timings.items():
+            print("{:<8}{:>12.4f}{:>14.3f}".format(name, total, total / len(pages) * 1000))
+        differences = sum(1 for old, new in zip(results["old"], results["new"]) if old != new)
+
+        # Short strings made of the characters that each pass treats specially
+        random.seed(0)
+        alphabet = list("aAndtThHeE xyz09-_.,;'`\"$*#") + ["  ", "\t", "\n", "\x1c", "\xa0", 
+            "\u2019", "\u201a", "\u00e9", "\u00df", "\u2003", "\u4e2d", "t h e", "T H e", "The", "a n d", "And", "- \n"]
+        strings = [
+            "".join(random.choices(alphabet, k=random.randint(1, 30)))
+            for _ in range(self.args.random)
+        ]
+        mismatches = [text for text in strings if self._clean_text_old(text) != TextNormalizer.normalize(text)]
+        print("{} page{} and {} of {} random strings had different text between the two.".format(
+            differences,
+            "s" if differences != 1 else "",
+            len(mismatches),
+            len(strings)
+        ))
+        for text in mismatches[:10]:
+            print(repr(text), repr(self._clean_text_old(text)), repr(TextNormalizer.normalize(text)))
+
+    # Page.clean_text before the passes were compiled and combined
+    def _clean_text_old(self, text_raw):
+        text_clean = re.sub(r"\s", " ", text_raw)
+        text_clean = unidecode.unidecode(text_clean)
+        text_clean = re.sub(r"[\u2018\u2019\u201a\u201b\u2032`']", r"'", text_clean)
+        text_clean = re.sub(r"\S-\s+", lambda x: x.group(0)[0], text_clean)
+        text_clean = re.sub(r'''[^a-zA-Z0-9' .;,"$/@!?&\-()_]''', r"", text_clean)
+        text_clean = re.sub(r"(\b\w\s)+", self._strip_whitespace_old, text_clean)
+        text_clean = re.sub(r"\s+", " ", text_clean)
+        text_clean = re.sub(r"\s[.,;]", lambda x: x.group(0)[1], text_clean)
+        text_clean = re.sub(
+            r"(?i)\bt\s?h\s?e\b", 
+            lambda x: x.group(0)[0]+"he", 
+            text_clean
+        )
+        text_clean = re.sub(
+            r"\ba\s?n\s?d\b", 
+            lambda x: x.group(0)[0]+"nd", 
+            text_clean
+        )
+        return text_clean.strip()
+
+    def _strip_whitespace_old(self, text):
+        text_new = ""
+        for c in text.group(0):
+            if not re.match(r"\s", c):
+                text_new += c
+        text_new += " "
+        return text_new
+
+    def suite(self):
+        if self.args.directory is None:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                self._suite(temp_dir)
+        else:
+            os.makedirs(self.args.directory, exist_ok=True)
+            self._suite(self.args.directory)
+
+    def _suite(self, directory):
+        print("Making a synthetic corpus in {}".format(directory))
+        corpus = SyntheticCorpus(directory)
+        pdf_text = fitz.open(corpus.text_pdf("text.pdf", self.args.pages))
+        pdf_scan = fitz.open(corpus.scan_pdf("scan.pdf", self.args.pages))
+        pdf_mixed = fitz.open(corpus.mixed_pdf("mixed.pdf", self.args.pages))
+        sized = {
+            size : fitz.open(corpus.text_pdf("size-{}.pdf".format(size), size)) 
+            for size in self.args.sizes
+        }
+        folder = corpus.folder("discovery", self.args.files)
+
+        args = Arguments('"{}" -q'.format(directory)).args
+        reader = ReadPDF.__new__(ReadPDF)
+        reader.args = args
+        reader.input_type = "dir"
+        dialog = ProgressOutput(reader, silent=True)
+        engine = OCREngine(**args)
+        tools = ProcessingTools()
+        cleaner = self._page(pdf_text[0], dialog, engine, args)
+        texts = [cleaner.clean_text(page.getText()) for page in pdf_text]
+        pages = len(texts)
+        stages = dict()
+
+        def stage(name, unit, items, function):
+            times = list()
+            try:
+                for _ in range(self.args.repeat):
+                    time_start = time.perf_counter()
+                    function()
+                    times.append(time.perf_counter() - time_start)
+            # Stages that need NLTK data that has not been downloaded are left out
+            except MissingCorpusError:
+                stages[name] = {"unit" : unit, "items" : items, "skipped" : "missing corpus"}
+                print("{:<36}{:>10} {:<6}{:>26}".format(name, items, unit, "missing corpus"))
+                return
+            stages[name] = {
+                "unit" : unit,
+                "items" : items,
+                "seconds" : times,
+                "best" : min(times),
+                "ms/item" : min(times) / items * 1000 if items > 0 else 0
+            }
+            print("{:<36}{:>10} {:<6}{:>12.4f}{:>14.3f}".format(
+                name, items, unit, min(times), stages[name]["ms/item"]
+            ))
+
+        print("{:<36}{:>17}{:>12}{:>14}".format("Stage", "Items", "Best (s)", "ms/item"))
+        stage("discovery", "file", self.args.files, lambda: reader.get_file_list(folder))
+        args_threads = dict(args, discovery_threads=8)
+        reader_threads = ReadPDF.__new__(ReadPDF)
+        reader_threads.args = args_threads
+        reader_threads.input_type = "dir"
+        stage("discovery.threads", "file", self.args.files, lambda: reader_threads.get_file_list(folder))
+
+        stage("read_page.text", "page", len(pdf_text), 
+            lambda: [self._page(page, dialog, engine, args).read_page() for page in pdf_text])
+        stage("read_page.mixed", "page", len(pdf_mixed), 
+            lambda: [self._page(page, dialog, engine, args).read_page() for page in pdf_mixed])
+        for size, pdf in sized.items():
+            stage("read_page.size-{}".format(size), "page", len(pdf), 
+                lambda: [self._page(page, dialog, engine, args).read_page() for page in pdf])
+
+        try:
+            ReadPDF.find_tesseract(None)
+            tesseract = True
+        except IOError:
+            tesseract = False
+        if tesseract:
+            stage("ocr_page.scan", "page", len(pdf_scan), 
+                lambda: [self._page(page, dialog, engine, args).ocr_page() for page in pdf_scan])
+            stage("ocr_page.mixed", "page", len(pdf_mixed), 
+                lambda: [self._page(page, dialog, engine, args).hybrid_page(page.getText()) for page in pdf_mixed])
+        else:
+            print("Tesseract OCR could not be found, so OCR is not timed.")
+
+        raw = [page.getText() for page in pdf_text]
+        stage("clean_text", "page", pages, lambda: [cleaner.clean_text(text) for text in raw])
+
+        matcher_only = tools._get_matcher([], tools.only_file)
+        matcher_ignore = tools._get_matcher([], tools.ignore_file, tools.stop_words_file)
+        operations = {
+            "autocorrect" : lambda text: tools.autocorrect(text, "correct", **args),
+            "lemmatize" : tools.lemmatize,
+            "remove_punctuation" : tools.remove_punctuation,
+            "remove_numbers" : tools.remove_numbers,
+            "words_only" : lambda text: tools.words_only(text, matcher_only),
+            "words_ignore" : lambda text: tools.words_ignore(text, matcher_ignore),
+        }
+        for name, operation in operations.items():
+            stage("processing.{}".format(name), "page", pages, 
+                lambda: [operation(text) for text in texts])
+
+        args_report = Arguments('"{}" -q -r'.format(directory)).args
+        args_pos = Arguments('"{}" -q -r -rpos'.format(directory)).args
+        stage("frequency_report", "page", pages, 
+            lambda: [FrequencyReport(text, **args_report) for text in texts])
+        stage("frequency_report.pos", "page", pages, 
+            lambda: [FrequencyReport(text, **args_pos) for text in texts])
+
+        largest = max(sized, key=lambda size: size)
+        text_file = File(sized[largest].name, dialog, **args)
+        basename = os.path.join(directory, "output")
+        stage("csv_writer", "row", len(text_file.pages), 
+            lambda: CSVWriter(text_file, output_file_basename=basename).write_content())
+
+        results = {
+            "created" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python" : platform.python_version(),
+            "platform" : platform.platform(),
+            "pymupdf" : fitz.VersionBind,
+            "options" : {
+                "pages" : self.args.pages, 
+                "sizes" : self.args.sizes, 
+                "files" : self.args.files, 
+                "repeat" : self.args.repeat
+            },
+            "stages" : stages
+        }
+        with open(self.args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+        print("Timings saved to {}".format(self.args.output))
+        if self.args.compare is not None:
+            self._compare(results)
+
+    # A page ready to be read, without reading it as Page.__init__ does
+    def _page(self, page, dialog, engine, args):
+        reader = Page.__new__(Page)
+        reader.args = args
+        reader.dialog = dialog
+        reader.dialog.page = reader
+        reader.ocr_engine = engine
+        reader.page = page
+        reader.page_number = page.number
+        reader.skipped = False
+        reader.method = "text"
+        reader.ocr_cached = False
+        return reader
+
+    # Runs are only compared by the time per item, as the corpus can be a different size
+    def _compare(self, results):
+        with open(self.args.compare, "r") as compare_file:
+            earlier = json.load(compare_file)
+        print("Compared with {} ({})".format(self.args.compare, earlier.get("created", "")))
+        print("{:<36}{:>14}{:>14}{:>10}".format("Stage", "Earlier (ms)", "Now (ms)", "Change"))
+        slower = 0
+        for name, timing in results["stages"].items():
+            if "skipped" in timing or "skipped" in earlier["stages"].get(name, {"skipped" : True}):
+                continue
+            before = earlier["stages"][name]["ms/item"]
+            change = (timing["ms/item"] - before) / before if before > 0 else 0
+            marked = change > self.args.threshold
+            slower += marked
+            print("{:<36}{:>14.3f}{:>14.3f}{:>+9.0%}{}".format(
+                name, before, timing["ms/item"], change, " slower" if marked else ""
+            ))
+        print("{} stage{} slower than the earlier run by more than {:.0%}.".format(
+            slower,
+            "s were" if slower != 1 else " was",
+            self.args.threshold
+        ))
+
+class SyntheticCorpus:
+
+    # Makes PDFs of made-up text from a fixed seed, so that every run reads the same corpus
+    vocabulary = (
+        "the of and to in a is that for it as was with be by on not he this are or his "
+        "from at which but have an they you were her she there been one all we their has "
+        "would when if so no will can more other what about up out them than into some "
+        "could time these two may then do first any my now such like our over man me even "
+        "most made after also did many before must through back years where much your way "
+        "well down should because each just those people how too little state good very make "
+        "world still own see men work long get here between both life being under never day "
+        "same another know while last might us great old year off come since against go came "
+        "right used take three recieve teh seperate occured definately goverment untill"
+    ).split()
+    page_size = (612, 792)
+    margin = 72
+    font_size = 11
+    scan_dpi = 150
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.random = random.Random(0)
+
+    def paragraph(self, words):
+        text = list()
+        for i in range(words):
+            word = self.random.choice(self.vocabulary)
+            roll = self.random.random()
+            if roll < 0.02:
+                word = str(self.random.randint(1, 2021))
+            elif roll < 0.04:
+                word = word + "-\n" + self.random.choice(self.vocabulary)
+            text.append(word)
+            if self.random.random() < 0.08:
+                text[-1] += self.random.choice([".", ".", ",", ";"])
+        return " ".join(text).capitalize() + "."
+
+    def page_text(self, paragraphs=4):
+        return "\n\n".join(self.paragraph(self.random.randint(40, 90)) for _ in range(paragraphs))
+
+    # Text that does not fit in the box is not written at all, so the pages 
+    # with less room have fewer paragraphs
+    def _write_text(self, page, rect, paragraphs=4):
+        page.insertTextbox(rect, self.page_text(paragraphs), fontsize=self.font_size, fontname="helv")
+
+    def _rect(self, top=0.0, bottom=1.0):
+        width, height = self.page_size
+        return fitz.Rect(
+            self.margin, 
+            self.margin + (height - 2 * self.margin) * top, 
+            width - self.margin, 
+            self.margin + (height - 2 * self.margin) * bottom
+        )
+
+    def _save(self, pdf, filename):
+        path = os.path.join(self.directory, filename)
+        pdf.save(path, garbage=3, deflate=True)
+        pdf.close()
+        return path
+
+    def text_pdf(self, filename, pages):
+        pdf = fitz.open()
+        for _ in range(pages):
+            page = pdf.newPage(width=self.page_size[0], height=self.page_size[1])
+            self._write_text(page, self._rect())
+        return self._save(pdf, filename)
+
+    # A grey image of a text page, as a scanner would make
+    def _scan(self, rect=None):
+        source = fitz.open()
+        page = source.newPage(width=self.page_size[0], height=self.page_size[1])
+        self._write_text(page, self._rect())
+        zoom = self.scan_dpi / 72
+        pix = page.getPixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, clip=rect)
+        source.close()
+        return pix
+
+    # Pages that are only an image of text, with no text layer
+    def scan_pdf(self, filename, pages):
+        pdf = fitz.open()
+        for _ in range(pages):
+            page = pdf.newPage(width=self.page_size[0], height=self.page_size[1])
+            page.insertImage(page.rect, pixmap=self._scan())
+        return self._save(pdf, filename)
+
+    # Pages with text above and an image of text below, as in a report with a figure
+    def mixed_pdf(self, filename, pages):
+        pdf = fitz.open()
+        for _ in range(pages):
+            page = pdf.newPage(width=self.page_size[0], height=self.page_size[1])
+            self._write_text(page, self._rect(0.0, 0.5), 2)
+            rect = self._rect(0.55, 1.0)
+            page.insertImage(rect, pixmap=self._scan(rect))
+        return self._save(pdf, filename)
+
+    # A folder tree of small PDFs, with other files and hidden PDFs that are left out
+    def folder(self, name, files):
+        root = os.path.join(self.directory, name)
+        template = self.text_pdf("template.pdf", 1)
+        with open(template, "rb") as template_file:
+            content = template_file.read()
+        os.remove(template)
+        for i in range(files):
+            folder = os.path.join(root, "folder-{}".format(i // 20), "sub-{}".format(i % 3))
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, "file-{}.pdf".format(i)), "wb") as pdf_file:
+                pdf_file.write(content)
+            if i % 10 == 0:
+                with open(os.path.join(folder, "notes-{}.txt".format(i)), "w") as text_file:
+                    text_file.write("Not a PDF")
+                with open(os.path.join(folder, ".hidden-{}.pdf".format(i)), "wb") as pdf_file:
+                    pdf_file.write(content)
+        return root
+
+def main():
+    Benchmark().run()
+
+if __name__ == "__main__":
+    main()
@@ -14,12 +14,16 @@
 #     You should have received a copy of the GNU General Public License
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-import os, re, csv, time, sys, argparse, math, tempfile
+import os, re, csv, time, sys, argparse, math, tempfile, queue, io, json, functools
+import multiprocessing, subprocess, sqlite3, hashlib, collections, heapq, pickle, threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 import fitz, pytesseract, unidecode
 from natsort import natsorted
+from PIL import Image
 from textblob import TextBlob
 from textblob import Word
 from textblob.en import Spelling
+from textblob.en import parse
 from .build_dictionary import BuildDict
 
 """ A class with the tools to translate a set of PDF files into a single CSV file using embedded text and OCR"""
@@ -51,6 +55,14 @@ class Arguments:
             "This will be much slower than the default option, but is the most thorough."), 
             action="store_true"
         )
+        # Hybrid (OCR images on text pages)
+        speedGroup.add_argument("-hy", "--hybrid", 
+            help=("Also use OCR for the images on pages that have machine readable text, "
+            "such as scanned figures or stamps, when there is no text over them. The "
+            "text from the images is added in reading order. Catches most of the text "
+            "that Thorough Mode would, in a fraction of the time."), 
+            action="store_true"
+        )
 
         # Arguments related to progress output
         progressGroup = parser.add_mutually_exclusive_group()
@@ -67,6 +79,170 @@ class Arguments:
             action="store_true"
         )
 
+        # Plan (only classify pages and estimate the time)
+        parser.add_argument("-pl", "--plan", 
+            help=("Do not read anything, but show how many pages of each file have text, "
+            "are scanned, mix the two or are blank, how many pages will need OCR with the "
+            "chosen options and roughly how long reading them will take."), 
+            action="store_true"
+        )
+
+        performanceGroup = parser.add_argument_group("Performance Options",
+            ("These options control how the work is spread across the "
+            "processor cores of your computer.")
+        )
+        performanceGroup.add_argument("-w", "--workers",
+            help=("Read several PDF files at the same time using the given number "
+            "of worker processes. Use 0 to use all available processor cores. "
+            "The output is identical to processing the files one after another."),
+            type=int,
+            default=1,
+            metavar="Number of Workers"
+        )
+        performanceGroup.add_argument("-wc", "--workerChunk",
+            help=("Used with the 'Workers' option, split PDF files longer than the given "
+            "number of pages into chunks of that many pages, so that the worker "
+            "processes can share the pages of a single very large file."),
+            type=int,
+            default=0,
+            metavar="Pages per Chunk",
+            dest="worker_chunk"
+        )
+        performanceGroup.add_argument("-oi", "--ocrInput",
+            help=("Choose how page images are handed to Tesseract OCR. 'memory' (default) "
+            "sends the image straight to Tesseract, 'file' saves each page as a "
+            "temporary PNG file first, as older versions of this program did."),
+            choices=["memory", "file"],
+            default="memory",
+            dest="ocr_input"
+        )
+        performanceGroup.add_argument("-ob", "--ocrBatch",
+            help=("Recognise the images of up to this many pages in a single run "
+            "of Tesseract OCR, instead of starting Tesseract once for every page. "
+            "Larger batches save more time but use more memory."),
+            type=int,
+            default=1,
+            metavar="Pages per OCR Batch",
+            dest="ocr_batch"
+        )
+        performanceGroup.add_argument("-os", "--ocrSource",
+            help=("Choose where the images for Tesseract OCR come from. 'extract' (default) "
+            "reads the scan itself on pages that are a single upright image covering the "
+            "page, at the resolution it was scanned at, and renders all other pages. "
+            "'render' renders every page, as older versions of this program did."),
+            choices=["extract", "render"],
+            default="extract",
+            dest="ocr_source"
+        )
+        performanceGroup.add_argument("-sb", "--skipBlank",
+            help=("Check a small image of every page that needs OCR first, and do not "
+            "read it with OCR if less than this percentage of it is covered in ink, "
+            "like the blank sheets and backs of pages in many scanned files. The pages "
+            "are kept in the output with no text. Optionally enter the percentage, "
+            "in quotes. Default is 0.1."),
+            nargs="?",
+            type=float,
+            const=0.1,
+            default=None,
+            metavar="Ink Percentage",
+            dest="skip_blank"
+        )
+        performanceGroup.add_argument("-od", "--ocrDPI",
+            help=("Render pages for OCR at this resolution, in dots per inch, instead of "
+            "at a fixed 3.2 times their size. Scanned pages are rendered no finer than "
+            "their scans, and very large pages are rendered coarser so that their "
+            "images stay a manageable size. 300 is a good choice for most files."),
+            type=int,
+            default=0,
+            metavar="OCR DPI",
+            dest="ocr_dpi"
+        )
+        performanceGroup.add_argument("-oc", "--ocrCache",
+            help=("Keep the OCR text of every page in a cache file, so that pages "
+            "that have already been read with OCR are not read again in later runs, "
+            "even with different processing options. Optionally enter the path of the "
+            "cache file, by default 'options/OCRCache.db' is used."),
+            nargs="?",
+            const=os.path.join("options", "OCRCache.db"),
+            default=None,
+            metavar="OCR Cache Path",
+            dest="ocr_cache"
+        )
+        performanceGroup.add_argument("-ocs", "--ocrCacheSize",
+            help=("The largest size in megabytes that the 'OCR Cache' is allowed to grow to. "
+            "The pages that were used least recently are removed first. Default is 1000."),
+            type=float,
+            default=1000,
+            metavar="OCR Cache Size",
+            dest="ocr_cache_size"
+        )
+        performanceGroup.add_argument("-sw", "--stream",
+            help=("Write every page to the output CSV as soon as it has been processed "
+            "and then let it go, instead of keeping all pages in memory until the end. "
+            "Uses far less memory for large collections of files. Frequency reports "
+            "are still written at the end. Can not be combined with the 'Resume' option."),
+            action="store_true",
+            dest="stream_output"
+        )
+        performanceGroup.add_argument("-tr", "--trace",
+            help=("Time every stage of reading, processing and writing each page, and show "
+            "the total time of each stage with the slowest pages and files at the end. "
+            "The timings are saved to a trace file that can be opened in Chrome "
+            "(chrome://tracing) or Perfetto. Optionally enter the path of the trace file, "
+            "by default it is saved next to the output CSV."),
+            nargs="?",
+            const="",
+            default=None,
+            metavar="Trace Path",
+            dest="trace"
+        )
+        performanceGroup.add_argument("-dt", "--discoveryThreads",
+            help=("The number of threads used to check that the files in a folder are PDF "
+            "files before any are read. Only the start of each file is checked, so more "
+            "threads mostly help with folders on network drives. Default is 1."),
+            type=int,
+            default=1,
+            metavar="Discovery Threads",
+            dest="discovery_threads"
+        )
+        performanceGroup.add_argument("-cc", "--correctionCache",
+            help=("Keep the autocorrect suggestion for every word in a cache file, so that "
+            "later runs with the same dictionary do not look up the same words again. "
+            "Optionally enter the path of the cache file, by default "
+            "'options/CorrectionCache.db' is used."),
+            nargs="?",
+            const=os.path.join("options", "CorrectionCache.db"),
+            default=None,
+            metavar="Correction Cache Path",
+            dest="correction_cache"
+        )
+        performanceGroup.add_argument("-ccs", "--correctionCacheSize",
+            help=("The largest size in megabytes that the 'Correction Cache' is allowed to "
+            "grow to. The words that were used least recently are removed first. "
+            "Default is 100."),
+            type=float,
+            default=100,
+            metavar="Correction Cache Size",
+            dest="correction_cache_size"
+        )
+        performanceGroup.add_argument("-in", "--incremental",
+            help=("Keep a manifest of every file that has been read next to the output "
+            "CSV, and on later runs with the same options only read the files that are "
+            "new or have changed since. Files that have been removed from the folder "
+            "are left out of the output. Can not be combined with the 'Stream' option."),
+            action="store_true"
+        )
+        performanceGroup.add_argument("-re", "--resume",
+            help=("Save every file in a folder to a checkpoint next to the output CSV as "
+            "soon as it has been read, so that a run that is stopped before it finishes "
+            "can be continued by running it again with this option. Only the files that "
+            "are not in the checkpoint are read again. The checkpoint is removed once all "
+            "output files have been written. Has no effect with the 'Stream' option, and "
+            "not needed with the 'Incremental' option, which keeps its manifest up to date "
+            "in the same way."),
+            action="store_true"
+        )
+
         fieldGroup = parser.add_argument_group("Field Options", 
             ("This mode allows for the customization of the fields used "
             "for the CSV columns. See Guide for usage and syntax.")
@@ -363,6 +539,9 @@ class ReadPDF:
         self.time_start_overall = time.perf_counter()
         self.args = Arguments(user_args).args
         self.path = self.args["filepath"]
+        self.stream = None
+        Tracer.start(self.args)
+        self.manifest = None
         # Run basic setup to confirm input can be processed
         try:
             # Confirm that Tesseract OCR is properly installed right away
@@ -375,13 +554,31 @@ class ReadPDF:
             self.path_list = self.get_file_list(self.args["filepath"])
             self.tools = ProcessingTools()
             self.tools._dictionary_process(**self.args)
+            self.workers = self._count_workers()
+            if self.args["plan"]:
+                self.plan = Plan(self)
+                self.dialog.plan_summary(self.plan)
+                return
+            self.manifest = self._open_manifest()
+            self.stream = self._open_stream()
             self.dialog.start_container()
             self.files = self._read_files()
-            self.text = " ".join(str(f.text) for f in self.files)
-            self.word_count = sum(f.word_count for f in self.files)
+            # Files that could not be opened after all are left out
+            self.path_list = [f.path for f in self.files]
+            if len(self.path_list) == 0:
+                raise self._no_pdf_error()
+            # Files from the manifest were read in an earlier run
+            self.files_read = [f for f in self.files if not f.from_manifest]
+            self.text = " ".join(str(f.text) for f in self.files if not f.released)
             self.page_count = sum(f.page_count for f in self.files)
             self.page_count_active = self.page_count - sum(f.page_count_skipped for f in self.files)
-            self._append_final_output_data()
+            self.page_count_ocr_cached = sum(f.page_count_ocr_cached for f in self.files_read)
+            self.page_count_ocr_read = sum(f.page_count_ocr_read for f in self.files_read)
+            self.page_count_blank = sum(f.page_count_blank for f in self.files_read)
+            self.dialog.ocr_cache_summary()
+            self.dialog.blank_summary()
+            if self.stream is None:
+                self._append_final_output_data()
 
             end_time = time.perf_counter()
             self.time = end_time-start_time
@@ -391,6 +588,14 @@ class ReadPDF:
             end_time = time.perf_counter()
             self.time = end_time-start_time
             self.error_found(err)
+
+    @property
+    def word_count(self):
+        return sum(f.word_count for f in self.files)
+
+    @property
+    def word_count_progress(self):
+        return sum(f.word_count_progress for f in self.files)
             
     # Check to see if Tesseract OCR has been installed as per README
     def find_tesseract(self):
@@ -441,62 +646,334 @@ class ReadPDF:
         else:
             return "file"   
 
-    # Create a list of all valid PDF files in a given path
+    # Create a list of all files in a given path that start like PDF files. They are only
+    # opened when they are read, see File.open_pdf
     def get_file_list(self, path):
         files = list()
         
-        # Create a list of all files in a given path
+        # Create a list of all files in a given path, visiting every folder once
         if self.input_type == "dir":
             dirs = [path]
             while len(dirs) > 0:
-                for(dirpath, dirnames, filenames) in os.walk(dirs.pop()):
-                    dirs.extend(dirnames)
-                    files.extend(
-                        map(
-                            lambda n: os.path.join(*n), zip(
-                                [dirpath] * len(filenames), filenames
-                                )
-                            )
-                    )
+                with os.scandir(dirs.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            dirs.append(entry.path)
+                        elif entry.is_file():
+                            files.append(entry.path)
         else:
             files.append(path)
 
-        pdf_files = list()
-
-        # Check all files in the file list, and create a new list with only valid PDF files (can be opened by MuPDF)
-        for file in files:
-            if os.path.splitext(file)[1].lower() == ".pdf" and os.path.basename(file)[0] != ".":
-                try:
-                    pdf = fitz.open(file)
-                    pdf.close()
-                    pdf_files.append(file)
-                except:
-                    pass
+        candidates = [
+            file for file in files 
+            if os.path.splitext(file)[1].lower() == ".pdf" and os.path.basename(file)[0] != "."
+        ]
+        if self.args["discovery_threads"] > 1 and len(candidates) > 1:
+            with ThreadPoolExecutor(max_workers=self.args["discovery_threads"]) as pool:
+                checks = list(pool.map(self.has_pdf_header, candidates))
+        else:
+            checks = [self.has_pdf_header(file) for file in candidates]
+        pdf_files = [file for file, check in zip(candidates, checks) if check]
 
         # Ensure the list is in natural reading order (as would be seen in the file manager)
         pdf_files = natsorted(pdf_files)
 
         # Raise an error if there are no valid PDF files
         if len(pdf_files) == 0:
-            ex = IOError()
-            pdf_err = ("The {} you have entered {} PDF file{}. "
-                "Please enter a PDF file or directory containing PDF files")
-            if self.input_type == "file":
-                ex.strerror = pdf_err.format("file", "is not a", "")
-            else:
-                ex.strerror = pdf_err.format("folder", "does not contain any", "s")
-            raise ex
+            raise self._no_pdf_error()
 
         return pdf_files
 
-    def _read_files(self):
-        return [File(path, self.dialog, **self.args) for path in self.path_list]
+    # PDF readers accept the header anywhere in the first kilobyte of a file
+    @staticmethod
+    def has_pdf_header(path):
+        try:
+            with open(path, "rb") as pdf_file:
+                return b"%PDF-" in pdf_file.read(1024)
+        except OSError:
+            return False
+
+    def _no_pdf_error(self):
+        ex = IOError()
+        pdf_err = ("The {} you have entered {} PDF file{}. "
+            "Please enter a PDF file or directory containing PDF files")
+        if self.input_type == "file":
+            ex.strerror = pdf_err.format("file", "is not a", "")
+        else:
+            ex.strerror = pdf_err.format("folder", "does not contain any", "s")
+        return ex
+
+    def _count_workers(self):
+        workers = self.args["workers"]
+        if workers < 1:
+            workers = os.cpu_count() or 1
+        # A single file can only keep several workers busy when it is split into chunks
+        if self.args["worker_chunk"] < 1:
+            workers = min(workers, len(self.path_list))
+        return workers
+
+    # Only ProcessPDF writes output, so there is nothing to stream while just reading
+    def _open_stream(self):
+        return None
+
+    def _open_manifest(self):
+        if not self.args["incremental"]:
+            # Only ProcessPDF writes output, so there is no run to finish and resume
+            if self.args["resume"]:
+                self.dialog.resume_unused("no output is written when files are only read")
+            return None
+        return Manifest(f"{self._output_basename()}-manifest.db", self._options_fingerprint())
+
+    # Manifests and checkpoints are kept next to the output CSV, see CSVWriter
+    def _output_basename(self):
+        return os.path.splitext(self.path)[0].rstrip("/\\")
+
+    # Gather the spans of the pages read in this run, wherever they were read, 
+    # along with the spans of this process, e.g. those of the CSVWriter
+    def finish_trace(self):
+        if not Tracer.enabled:
+            return
+        spans = [
+            span 
+            for f in self.files_read 
+            for page in f.pages 
+            for span in getattr(page, "spans", [])
+        ]
+        spans.extend(Tracer.stop())
+        path = self.args["trace"] or f"{self._output_basename()}-trace.json"
+        Tracer.write_chrome(path, spans, self.time_start_overall)
+        pages = heapq.nlargest(
+            Tracer.top, 
+            [(page.time, f.filename, page.page_number + 1) for f in self.files_read for page in f.pages]
+        )
+        # Page times already include processing, which the time of a processed file adds again
+        files = heapq.nlargest(
+            Tracer.top, 
+            [(sum(page.time for page in f.pages), f.filename) for f in self.files_read]
+        )
+        self.dialog.trace_summary(Tracer.summarize(spans), pages, files, path)
+
+    # Everything that changes what is read from a file, how it is processed or what
+    # is kept of it, but not how it is written or how fast it is read
+    def _options_fingerprint(self):
+        ignored = [
+            "filepath", "quiet", "verbose", "split", "fields", "source_text", "corrections",
+            "tokenize_sentences", "tokenize_words", "workers", "worker_chunk", "ocr_input", 
+            "ocr_batch", "ocr_cache", "ocr_cache_size", "stream_output", "correction_cache", 
+            "correction_cache_size", "incremental", "resume", "discovery_threads", "plan",
+            "trace"
+        ]
+        options = sorted((k, repr(v)) for k, v in self.args.items() if k not in ignored)
+        # Pages only keep the columns and the text that are written, see OutputColumns,
+        # so files saved for other columns can not be written again
+        outputs = (sorted(OutputColumns.requested(self.args)), Page.text_needed(self.args))
+        # Dictionaries and word lists in the options folder change the results as well
+        option_files = sorted(
+            (name, os.path.getmtime(os.path.join("options", name)))
+            for name in (os.listdir("options") if os.path.isdir("options") else [])
+            if name.endswith(".txt")
+        )
+        return hashlib.sha256(
+            repr((type(self).__name__, options, outputs, option_files)).encode("utf-8")
+        ).hexdigest()
+
+    def _read_files(self, file_class=None):
+        file_class = File if file_class is None else file_class
+        if self.manifest is None:
+            files = self._read_paths(self.path_list, file_class)
+            return [f for f in files if f is not None]
+        files = dict()
+        if self.args["incremental"]:
+            files = self.manifest.load(self.path_list)
+            self.dialog.files_unchanged(len(files))
+        elif self.args["resume"]:
+            files = self.manifest.load(self.path_list)
+            self.dialog.files_resumed(len(files))
+        for f in files.values():
+            f.dialog = self.dialog
+        paths = [path for path in self.path_list if path not in files]
+        files_read = self._read_paths(paths, file_class)
+        files.update(zip(paths, files_read))
+        return [files[path] for path in self.path_list if files[path] is not None]
+
+    # Read the files in order, with None in place of each file that can not be opened
+    def _read_paths(self, paths, file_class):
+        if len(paths) == 0:
+            return list()
+        if self.workers > 1:
+            return self._read_files_parallel(paths, file_class)
+        files = list()
+        for path in paths:
+            try:
+                f = file_class(path, self.dialog, stream=self.stream, **self.args)
+            except PDFOpenError as err:
+                self.dialog.file_invalid(err.path)
+                files.append(None)
+                continue
+            if self.stream is not None:
+                self.stream.end_file(f)
+            self._checkpoint(f)
+            files.append(f)
+        return files
+
+    # Save each file as soon as it has been read, so that a stopped run loses at most
+    # the files that were being read at the time
+    def _checkpoint(self, f):
+        if self.manifest is not None:
+            self.manifest.save([f])
+
+    # List the work for the pool as (file index, path, first page, last page + 1),
+    # where whole files are read in one piece and have no page range. The work is 
+    # weighed by file size, which is mostly made up of scanned images, so that no 
+    # page has to be looked at before the workers can start
+    def _get_pool_tasks(self, paths):
+        tasks = list()
+        costs = list()
+        chunk = self.args["worker_chunk"]
+        for i, path in enumerate(paths):
+            size = os.path.getsize(path)
+            page_count = 0
+            # A file that can not be opened is read whole, so the worker reports it
+            if chunk > 0 and self.has_pdf_header(path):
+                try:
+                    with File.open_pdf(path) as pdf:
+                        page_count = len(pdf)
+                except PDFOpenError:
+                    pass
+            if chunk > 0 and page_count > chunk:
+                for start in range(0, page_count, chunk):
+                    stop = min(start + chunk, page_count)
+                    tasks.append((i, path, start, stop))
+                    costs.append(size * self._count_pages_chosen(start, stop) / page_count)
+            else:
+                tasks.append((i, path, None, None))
+                costs.append(size)
+        # Hand out the slowest work first, so that it is not left to a single worker
+        # at the end of the run
+        order = sorted(range(len(tasks)), key=lambda task: costs[task], reverse=True)
+        return [tasks[task] for task in order]
+
+    # Pages that are skipped cost nothing to read
+    def _count_pages_chosen(self, start, stop):
+        if len(self.args["pages"]) == 0:
+            return stop - start
+        return len([page for page in self.args["pages"] if start <= page < stop])
+
+    # Fan the files out to a pool of worker processes and put them back in natural order
+    def _read_files_parallel(self, paths, file_class):
+        tasks = self._get_pool_tasks(paths)
+        workers = min(self.workers, len(tasks))
+        files = [None] * len(paths)
+        files_finished = [False] * len(paths)
+        files_streamed = 0
+        chunks_expected = [0] * len(paths)
+        chunks_read = [dict() for path in paths]
+        events = multiprocessing.Queue()
+        self.dialog.start_pool(workers)
+        # When streaming, files that finish before the files ahead of them are kept on 
+        # disk rather than in memory until it is their turn to be written
+        files_spilled = tempfile.TemporaryDirectory() if self.stream is not None else None
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_pool_start,
+            initargs=(events, pytesseract.pytesseract.tesseract_cmd)
+        ) as pool:
+            futures = dict()
+            for i, path, start, stop in tasks:
+                if start is None:
+                    future = pool.submit(_pool_read_file, file_class, path, self.args)
+                else:
+                    future = pool.submit(
+                        _pool_read_pages, file_class, path, start, stop, self.args
+                    )
+                    chunks_expected[i] += 1
+                futures[future] = (i, start)
+            pending = set(futures)
+            while len(pending) > 0:
+                done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                self._drain_events(events)
+                for future in done:
+                    i, start = futures[future]
+                    if start is None:
+                        try:
+                            f = future.result()
+                        except PDFOpenError as err:
+                            self.dialog.file_invalid(err.path)
+                            files_finished[i] = True
+                            continue
+                    else:
+                        chunks_read[i][start] = future.result()
+                        if len(chunks_read[i]) < chunks_expected[i]:
+                            continue
+                        # Reassemble the chunks of the file in page order
+                        pages = [
+                            page
+                            for start in sorted(chunks_read[i])
+                            for page in chunks_read[i][start]
+                        ]
+                        chunks_read[i] = None
+                        f = file_class(
+                            paths[i],
+                            ProgressRelay(None),
+                            page_list=pages,
+                            **self.args
+                        )
+                    f.dialog = self.dialog
+                    files[i] = f
+                    files_finished[i] = True
+                    self.dialog.pool_file_complete(f)
+                    self._checkpoint(f)
+                    if files_spilled is not None and i > files_streamed:
+                        self._spill_file(files_spilled.name, i, f)
+                        files[i] = None
+                # Files can only be streamed once all files before them are written
+                while self.stream is not None and files_streamed < len(files):
+                    i = files_streamed
+                    if not files_finished[i]:
+                        break
+                    if files[i] is None:
+                        files[i] = self._unspill_file(files_spilled.name, i)
+                    if files[i] is not None:
+                        self.stream.write_file(files[i])
+                    files_streamed += 1
+        if files_spilled is not None:
+            files_spilled.cleanup()
+        self._drain_events(events)
+        return files
+
+    @staticmethod
+    def _spill_file(temp_dir, i, f):
+        dialog = f.dialog
+        f.dialog = None
+        with open(os.path.join(temp_dir, f"{i}.pickle"), "wb") as spill:
+            pickle.dump(f, spill, protocol=pickle.HIGHEST_PROTOCOL)
+        f.dialog = dialog
+
+    # Files that could not be opened were never spilled
+    def _unspill_file(self, temp_dir, i):
+        path = os.path.join(temp_dir, f"{i}.pickle")
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as spill:
+            f = pickle.load(spill)
+        os.remove(path)
+        f.dialog = self.dialog
+        return f
+
+    def _drain_events(self, events):
+        while True:
+            try:
+                self.dialog.pool_page_complete(*events.get_nowait())
+            except queue.Empty:
+                break
 
     def _append_final_output_data(self):
         counter_page = 1
         for f in self.files:
             for page in f.pages:
-                page.output_data["Page Number (Overall)"] = counter_page
+                page.output_data.update(
+                    OutputColumns.resolve("output", self.args, page, counter_page)
+                )
                 counter_page += 1
 
     
@@ -506,96 +983,374 @@ class ReadPDF:
     # Error dialog
     def error_found(self, e):
         print("Sorry! There's been a problem. {} and try again.".format(e.strerror))
+
+class PDFOpenError(IOError):
+    def __init__(self, path):
+        super().__init__(path)
+        self.path = path
+        self.strerror = "The file {} could not be opened as a PDF file".format(path)
+
+class Tracer:
+
+    # Named spans around the stages of reading, processing and writing, which are only
+    # kept when the Trace option is used. Each process keeps the spans it has finished 
+    # until they are taken by the page they belong to, see File._iter_page_range, so that
+    # the spans of pages read by worker processes come back with the pages
+    enabled = False
+    spans = list()
+    top = 5
+
+    @classmethod
+    def start(cls, args):
+        if args["trace"] is not None and not cls.enabled:
+            cls.enabled = True
+            cls.spans = list()
+
+    @classmethod
+    def stop(cls):
+        cls.enabled = False
+        return cls.take()
+
+    @classmethod
+    def take(cls, **details):
+        spans = cls.spans
+        cls.spans = list()
+        if len(details) > 0:
+            spans = [span[:-1] + (dict(details, **span[-1]),) for span in spans]
+        return spans
+
+    # Wrap a method in a span, which costs a single check while tracing is off
+    @staticmethod
+    def traced(name):
+        def decorate(function):
+            @functools.wraps(function)
+            def traced_function(*args, **kwargs):
+                if not Tracer.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    Tracer.spans.append((
+                        name, 
+                        start, 
+                        time.perf_counter() - start, 
+                        os.getpid(), 
+                        threading.get_ident(), 
+                        {}
+                    ))
+            return traced_function
+        return decorate
+
+    # Spans of the same stage nest inside other stages, so the totals overlap
+    @staticmethod
+    def summarize(spans):
+        durations = collections.defaultdict(list)
+        for name, start, duration, pid, tid, details in spans:
+            durations[name].append(duration)
+        rows = list()
+        for name, times in durations.items():
+            times.sort()
+            rows.append({
+                "name" : name,
+                "count" : len(times),
+                "total" : sum(times),
+                "p50" : Tracer._percentile(times, 0.5),
+                "p90" : Tracer._percentile(times, 0.9),
+                "p99" : Tracer._percentile(times, 0.99),
+                "max" : times[-1]
+            })
+        return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+    # Nearest rank, so that every percentile is a time that was measured
+    @staticmethod
+    def _percentile(times, share):
+        return times[max(math.ceil(share * len(times)) - 1, 0)]
+
+    # Chrome's trace event format, with times in microseconds from the start of the run
+    @staticmethod
+    def write_chrome(path, spans, origin):
+        events = [
+            {
+                "name" : name,
+                "cat" : "datasets-from-pdfs",
+                "ph" : "X",
+                "ts" : round((start - origin) * 1e6, 3),
+                "dur" : round(duration * 1e6, 3),
+                "pid" : pid,
+                "tid" : tid,
+                "args" : details
+            }
+            for name, start, duration, pid, tid, details in spans
+        ]
+        events.extend(
+            {
+                "name" : "process_name", 
+                "ph" : "M", 
+                "pid" : pid, 
+                "args" : {"name" : "main" if pid == os.getpid() else f"worker {pid}"}
+            }
+            for pid in sorted(set(span[3] for span in spans))
+        )
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents" : events, "displayTimeUnit" : "ms"}, trace_file)
+
+# Progress dialog used by the files read in the current worker process
+_pool_dialog = None
+
+def _pool_start(events, tesseract_path):
+    global _pool_dialog
+    _pool_dialog = ProgressRelay(events)
+    pytesseract.pytesseract.tesseract_cmd = tesseract_path
+
+def _pool_read_file(file_class, path, args):
+    Tracer.start(args)
+    return file_class(path, _pool_dialog, **args)
+
+def _pool_read_pages(file_class, path, start, stop, args):
+    Tracer.start(args)
+    with File.open_pdf(path) as pdf:
+        _pool_dialog.start_range(path, len(pdf))
+        pages = file_class._read_page_range(pdf, start, stop, _pool_dialog, **args)
+    SQLiteCache.flush_opened()
+    return pages
     
 class File:
 
-    def __init__(self, file_path, dialog, **args):
+    def __init__(self, file_path, dialog, page_list=None, stream=None, **args):
         start_time = time.perf_counter()
         self.dialog = dialog
         self.dialog.file = self
         self.args = args
+        self.stream = stream
+        self.released = False
+        self.from_manifest = False
         self.path = file_path
         self.filename = os.path.basename(file_path)
-        self.pdf = fitz.open(file_path)
+        self.pdf = self.open_pdf(file_path)
         self.dialog.start_file()
-        self.pages = self._read_pages()
+        # Pages may already have been read elsewhere, e.g. in chunks by worker processes
+        if page_list is None:
+            self.pages = self._read_pages()
+            # What the pages added to the OCR and correction caches is saved once per file
+            SQLiteCache.flush_opened()
+            time_pages = 0.0
+        else:
+            self.pages = page_list
+            time_pages = sum(page.time for page in self.pages)
         self.page_count_skipped = sum(1 for page in self.pages if page.skipped)
         self.page_count = len(self.pages)
         self.page_count_ocr = sum(1 for page in self.pages if page.method == "ocr")
+        self.page_count_ocr_cached = sum(1 for page in self.pages if page.ocr_cached)
+        self.page_count_ocr_read = sum(
+            1 for page in self.pages 
+            if page.method == "ocr" and not page.skipped and not page.ocr_cached
+        )
+        self.page_count_blank = sum(1 for page in self.pages if page.method == "blank")
         self.page_count_text =  self.page_count - self.page_count_ocr
-        self.word_count = sum(page.word_count for page in self.pages)
-        self.text = " ".join([str(page.text) for page in self.pages])
-        self._append_file_output_data()
+        self.text = " ".join([str(page.text) for page in self.pages if not page.released])
+        if self.stream is None:
+            self._append_file_output_data()
         end_time = time.perf_counter()
-        self.time = end_time - start_time   
+        self.time = end_time - start_time + time_pages
 
     def __repr__(self):
         return self.path
+
+    @property
+    def word_count(self):
+        return sum(page.word_count for page in self.pages)
+
+    @property
+    def word_count_progress(self):
+        return sum(page.word_count_progress for page in self.pages)
+
+    # Files are only checked for a PDF header when they are listed, so a file that
+    # MuPDF can not open is only found once it is read
+    @staticmethod
+    def open_pdf(path):
+        try:
+            return fitz.open(path)
+        except Exception:
+            raise PDFOpenError(path)
     
     def __str__(self):
         return self.filename
 
+    # The open PDF and the progress dialog stay behind when a file is sent between processes
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for attr in ["pdf", "dialog", "stream"]:
+            state.pop(attr, None)
+        return state
+
     def _read_pages(self):
-        return [Page(page, self.pdf, self.dialog, **self.args) for page in self.pdf]
+        if self.stream is None:
+            return self._read_page_range(self.pdf, 0, len(self.pdf), self.dialog, **self.args)
+        # Write each page as soon as it is done, so only its counts are kept
+        self.stream.start_file(self)
+        pages = list()
+        for page in self._iter_page_range(self.pdf, 0, len(self.pdf), self.dialog, **self.args):
+            self._append_page_output_data(page, len(pages))
+            self.stream.write_page(page)
+            pages.append(page)
+        return pages
+
+    @classmethod
+    def _read_page_range(cls, pdf, start, stop, dialog, **args):
+        return list(cls._iter_page_range(pdf, start, stop, dialog, **args))
+
+    @classmethod
+    def _iter_page_range(cls, pdf, start, stop, dialog, **args):
+        ocr_engine = OCREngine(**args)
+        for page in ocr_engine.iter_pages(pdf, start, stop):
+            page = Page(page, pdf, dialog, ocr_engine, **args)
+            if not Page.text_needed(args):
+                page.drop_text()
+            if Tracer.enabled:
+                page.spans = Tracer.take(
+                    file=os.path.basename(pdf.name), 
+                    page=page.page_number + 1
+                )
+            yield page
 
     def _append_file_output_data(self):
 
-        for page in self.pages:
+        for i, page in enumerate(self.pages):
+            self._append_page_output_data(page, i)
 
-            page.output_data.update(
-                {
-                    "Source File Path" : self.path, 
-                    "Source File Name" : self.filename, 
-                    "Page Number (Overall)" : self.pages.index(page) + 1,
-                    "Page Processing Duration (s)" : f"{round(page.time,3)}",
-                }
-            )
+    def _append_page_output_data(self, page, index):
+        page.output_data.update(OutputColumns.resolve("file", self.args, page, self, index))
+
+    # Let go of the text once the file has been written by a StreamWriter
+    def release(self):
+        for page in self.pages:
+            page.release()
+        self.text = ""
+        self.released = True
 
 class Page:
 
-    def __init__(self, page, pdf, dialog, **args):
+    def __init__(self, page, pdf, dialog, ocr_engine=None, **args):
         self.start_time = time.perf_counter()
         self.args = args
         self.dialog = dialog
         self.dialog.page = self
+        self.ocr_engine = OCREngine(**args) if ocr_engine is None else ocr_engine
         self.page_number = page.number
         self.skipped = (len(self.args["pages"]) > 0 and self.page_number not in self.args["pages"])
         self.page = page
         self.method = "text"
+        self.ocr_cached = False
+        self.released = False
         if not self.skipped:
             self.pdf = pdf
             self.text = self.read_page()
             self.text_whole = self.text
-            self.word_count = len(self.text.words)
-            self.sentence_count = len(self.text.sentences)
+            # Counted from the text as it was read, before any processing
+            self.text_read = self.text
+            self._word_count = None
+            self._sentence_count = None
+            self._word_count_progress = len(self.text_read.split())
             self.output_data = self._build_output_dict()
         else: 
-            self.text = TextBlob("")
+            self.text = ""
+            self.text_read = ""
             self.pdf = None
-            self.word_count = 0
-            self.sentence_count = 0
+            self._word_count = 0
+            self._sentence_count = 0
+            self._word_count_progress = 0
             self.dialog.page_skip()
         end_time = time.perf_counter()
         self.time = end_time-self.start_time
         self.dialog.page_read()
 
     def __repr__(self):
-        return str(self.page.number)
+        return str(self.page_number)
 
     def __str__(self):
         return "Page {}".format(self.page_number)
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for attr in ["page", "pdf", "dialog", "ocr_engine"]:
+            state.pop(attr, None)
+        return state
+
+    # Words and sentences are only split out of the text by TextBlob (and so NLTK) 
+    # the first time they are counted, see counts_needed
+    @property
+    def word_count(self):
+        if self._word_count is None:
+            self._word_count = len(TextBlob(self.text_read).words)
+        return self._word_count
+
+    @property
+    def sentence_count(self):
+        if self._sentence_count is None:
+            self._sentence_count = len(TextBlob(self.text_read).sentences)
+        return self._sentence_count
+
+    # Progress messages only split the text on whitespace, unless the words are 
+    # counted for the Word Count column anyway
+    @property
+    def word_count_progress(self):
+        if self.counts_needed(self.args):
+            return self.word_count
+        return self._word_count_progress
+
+    # The word counts of pages are only written in the Word Count column
+    @staticmethod
+    def counts_needed(args):
+        return "Word Count" in OutputColumns.requested(args)
+
+    # Reports are made while a page is processed, so after that its text is only
+    # needed for the text columns and the tokenize options
+    @staticmethod
+    def text_needed(args):
+        return any([
+            "Text" in OutputColumns.requested(args),
+            "Raw Text" in OutputColumns.requested(args),
+            args["tokenize_sentences"],
+            args["tokenize_words"]
+        ])
+
+    def drop_text(self):
+        if self.counts_needed(self.args):
+            self.word_count
+        self.text = ""
+        self.text_whole = ""
+        self.text_read = ""
+
+    # Keep only the counts and reports of a page that has already been written
+    def release(self):
+        if self.released:
+            return
+        for attr in ["page", "pdf", "ocr_engine", "tools", "output_data", "output_data_whole"]:
+            self.__dict__.pop(attr, None)
+        self.drop_text()
+        if hasattr(self, "report"):
+            self.report.release()
+        self.released = True
+
+    @Tracer.traced("read_page")
     def read_page(self):
+        # Pages with nothing on them have no text to find, with or without OCR
+        if self.args["thorough"] and PageClassifier.is_blank(self.page):
+            self.method = "blank"
+            text = ""
         # try to extract text
-        if self.args["thorough"]:
+        elif self.args["thorough"]:
             self.dialog.ocr_switch()
             self.method = "ocr"
             text = self.ocr_page()
         else:
             self.method = "text"
-            text = self.page.getText()
+            text = self.ocr_engine.page_text(self.page)
 
-            if len(text) < 1:   # OCR the page if there is no text or if forced
+            if len(text) < 1 and PageClassifier.is_blank(self.page):
+                self.method = "blank"
+            elif len(text) < 1:   # OCR the page if there is no text or if forced
                 self.method = "ocr"
                 if self.args["accelerated"]:  # Skip if Accelerated option active
                     self.skipped = True
@@ -603,131 +1358,897 @@ class Page:
                 else:
                     self.dialog.ocr_switch()
                     text = self.ocr_page()
+            elif self.args["hybrid"]:
+                text = self.hybrid_page(text)
                     
-        text = self.clean_text(text) # Pass text through text cleaning processes
-        return TextBlob(text)
+        return self.clean_text(text) # Pass text through text cleaning processes
     
+    @Tracer.traced("ocr_page")
     def ocr_page(self):
-        with tempfile.TemporaryDirectory() as temp_dir:
-            zoom_matrix = fitz.Matrix(3.2,3.2)   # Set the optimal settings for OCR-readable images
-            pix = self.page.getPixmap(matrix=zoom_matrix, colorspace=fitz.csGRAY, alpha=True) # Generate pixmap from PDF page
-            img = os.path.join(temp_dir,"page-{}.png".format(self.page.number)) # find image in pixmap
-            pix.writePNG(img)   # Grab image and save it
-            
-            text = self.ocr(img)                        
+        text = self.ocr_engine.read(self.page)
+        # Scans of empty sheets are not worth a call to Tesseract
+        if text is None:
+            self.method = "blank"
+            return ""
+        self.ocr_cached = self.ocr_engine.from_cache
         return text
     
-    def _build_output_dict(self):
-        return {
-            "Page Number (File)":self.page_number + 1, 
-            "Word Count":self.word_count,
-            "Text":self.text, 
-            "Process Timestamp":time.asctime(), 
-            "Raw Text":self.text_whole
+    # Replace the images on a page that have no text over them with their OCR text,
+    # keeping the text layer as it is
+    @Tracer.traced("hybrid_page")
+    def hybrid_page(self, text):
+        blocks = self.page.getText("blocks", sort=True)
+        regions = self.ocr_engine.image_regions(self.page, blocks)
+        if len(regions) == 0:
+            return text
+        self.method = "hybrid"
+        region_text = {
+            number : region + "\n" 
+            for number, region in zip(regions, self.ocr_engine.read_regions(self.page, regions))
         }
+        return "".join(
+            region_text.get(block[5], "") if block[6] == 1 else block[4]
+            for block in blocks
+        )
+
+    def _build_output_dict(self):
+        return OutputColumns.resolve("page", self.args, self)
 
     # Use tesseract to get text via OCR
     def ocr(self, img):
-        try:
-            text = pytesseract.image_to_string(img, lang="eng", config="--psm 1")
-        except:
-            print(("\rSorry! There appears to be an issue with your Tesseract OCR installation. "
-            "Please refer to the instruction manual for more details."))
-            text = ""
-        return text
+        return self.ocr_engine.recognise_file(img)
 
+    @Tracer.traced("clean_text")
     def clean_text(self, text_raw):
+        return TextNormalizer.normalize(text_raw)
+    
+class TextNormalizer:
+
+    # Every character that "\s" matches becomes a plain space in one table lookup, which
+    # for text in ASCII also turns back quotes into apostrophes
+    whitespace_ascii = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f "
+    whitespace = (whitespace_ascii + "\x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005"
+        "\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000")
+    table_whitespace = str.maketrans(whitespace, " " * len(whitespace))
+    table_ascii = str.maketrans(whitespace_ascii + "`", " " * len(whitespace_ascii) + "'")
+    table_apostrophes = str.maketrans("`", "'")
+    # Punctuation that is not grammatical is deleted in a single table lookup, as the
+    # text is all ASCII by then
+    table_allowed = str.maketrans("", "", re.sub(
+        r'''[a-zA-Z0-9' .;,"$/@!?&\-()_]''', 
+        "", 
+        "".join(map(chr, range(128)))
+    ))
+    # Patterns that start with a plain character are found much faster than ones that
+    # start with a character class, hence the lookbehind for the letter before a hyphen
+    pattern_hyphens = re.compile(r"(?<=\S)-\s+")
+    # Once only the allowed characters are left, spaces are the only whitespace
+    pattern_letters = re.compile(r"(?<!\w)\w (?:\w )+")
+    pattern_spaces = re.compile(r"  +")
+    pattern_punctuation = re.compile(r" ([.,;])")
+    # Only "the" and "and" that are split up or in capitals are replaced
+    pattern_words = re.compile(r"\b(?:[tT](?!he\b) ?[hH] ?[eE]|a(?!nd\b) ?n ?d)\b")
+    # str.isascii needs Python 3.7
+    pattern_non_ascii = re.compile(r"[^\x00-\x7f]")
+
+    @classmethod
+    def normalize(cls, text):
+        # Text that is already ASCII has nothing for unidecode to change
+        if cls.pattern_non_ascii.search(text) is None:
+            text = text.translate(cls.table_ascii)
+        else:
+            text = text.translate(cls.table_whitespace)
+            # Strip accents and convert unicode symbols to ascii and transliterate non-latin characters
+            text = unidecode.unidecode(text).translate(cls.table_apostrophes)
+        #connect hyphenated line breaks
+        text = cls.pattern_hyphens.sub("", text).translate(cls.table_allowed)
+        # clean words split up by spaces
+        text = cls.pattern_letters.sub(lambda x: x.group(0).replace(" ", "") + " ", text)
+        # fix spaces
+        text = cls.pattern_spaces.sub(" ", text)
+        text = cls.pattern_punctuation.sub(r"\1", text)
+        # common splits
+        text = cls.pattern_words.sub(
+            lambda x: x.group(0)[0] + ("nd" if x.group(0)[0] == "a" else "he"), 
+            text
+        )
+        return text.strip()
 
-            # make all space (inluding line breaks) into standard spaces
-            text_clean = re.sub(r"\s", " ", text_raw)
+class PageClassifier:
 
-            # Strip accents and convert unicode symbols to ascii and transliterate non-latin characters
-            text_clean = unidecode.unidecode(text_clean)
+    kinds = ["text", "scanned", "mixed", "blank"]
+
+    # Sort a page by its fonts, images and contents alone, without extracting
+    # or rendering anything
+    @classmethod
+    def classify(cls, page):
+        if cls.is_blank(page):
+            return "blank"
+        if len(page.getFontList()) == 0:
+            return "scanned"
+        for image in page.getImageList(full=True):
+            try:
+                bbox = page.getImageBbox(image) & page.rect
+            except ValueError:
+                continue
+            if min(bbox.width, bbox.height) >= OCREngine.region_min_size:
+                return "mixed"
+        return "text"
+
+    # Nothing is drawn by a page without contents, images, forms or annotations
+    @staticmethod
+    def is_blank(page):
+        return all([
+            len(page.readContents().strip()) == 0,
+            len(page.getImageList()) == 0,
+            len(page.parent.getPageXObjectList(page.number)) == 0,
+            page.firstAnnot is None,
+            page.firstWidget is None
+        ])
+
+    # Whether a kind of page is read with OCR with the chosen options
+    @staticmethod
+    def needs_ocr(kind, args):
+        if kind == "blank" or args["accelerated"]:
+            return False
+        if args["thorough"]:
+            return True
+        if args["hybrid"]:
+            return kind in ["scanned", "mixed"]
+        return kind == "scanned"
+
+class OCREngine:
+
+    # Set the optimal settings for OCR-readable images
+    zoom = 3.2
+    lang = "eng"
+    psm = 1
+    # The most pixels a page image may have when rendering at a set resolution
+    pixel_limit = 40000000
+    # Scans are never rendered coarser than this, unless a lower resolution is chosen
+    dpi_min = 150
+    # Blank pages are found in an image at a quarter of the resolution of the page, where
+    # ink is anything this much darker than the paper
+    thumbnail_zoom = 0.5
+    ink_contrast = 64
+    # The share of a page that its only image must cover to be read in place of the page
+    image_coverage = 0.95
+    # Images are only read in hybrid mode if they are at least this big, in points,
+    # and less than this share of them is covered by text
+    region_min_size = 36
+    region_text_coverage = 0.5
+
+    def __init__(self, **args):
+        self.args = args
+        self.in_memory = args.get("ocr_input", "memory") == "memory"
+        self.batch_size = args.get("ocr_batch", 1)
+        self.dpi = args.get("ocr_dpi", 0)
+        self.extract = args.get("ocr_source", "extract") == "extract"
+        self.blank_threshold = args.get("skip_blank")
+        # Pages already checked for ink while batching, by page number
+        self.batch_blank = dict()
+        # Text of upcoming pages, keyed by page number, collected while batching
+        self.batch_text = dict()
+        self.batch_ocr = dict()
+        # Cache keys of pages that were not in the cache, so that the pages a batch 
+        # falls back to reading one by one are not looked up again
+        self.batch_keys = dict()
+        self.cache = None
+        if args.get("ocr_cache") is not None:
+            self.cache = SQLiteCache.open(
+                args["ocr_cache"], 
+                "ocr", 
+                args["ocr_cache_size"] * 1024 * 1024
+            )
+        self.from_cache = False
+        self.failed = False
+
+    # Yield the pages in a range, recognising the OCR pages of each batch in one go
+    def iter_pages(self, pdf, start, stop):
+        if self.batch_size < 2:
+            for i in range(start, stop):
+                yield pdf[i]
+        else:
+            for batch_start in range(start, stop, self.batch_size):
+                pages = [
+                    pdf[i] for i in range(batch_start, min(batch_start + self.batch_size, stop))
+                ]
+                self.read_batch([page for page in pages if self._needs_ocr(page)])
+                for page in pages:
+                    yield page
+
+    # Mirrors the choice made in Page.read_page
+    def _needs_ocr(self, page):
+        if len(self.args["pages"]) > 0 and page.number not in self.args["pages"]:
+            return False
+        if self.args["thorough"]:
+            return not PageClassifier.is_blank(page)
+        if self.args["accelerated"]:
+            return False
+        self.batch_text[page.number] = page.getText()
+        return len(self.batch_text[page.number]) < 1 and not PageClassifier.is_blank(page)
+
+    # Whether a scanned page has so little ink on it that it is not worth reading
+    @Tracer.traced("looks_blank")
+    def looks_blank(self, page):
+        if self.blank_threshold is None:
+            return False
+        if page.number in self.batch_blank:
+            return self.batch_blank.pop(page.number)
+        zoom_matrix = fitz.Matrix(self.thumbnail_zoom, self.thumbnail_zoom)
+        pix = page.getPixmap(matrix=zoom_matrix, colorspace=fitz.csGRAY, alpha=False)
+        return self.ink_share(pix) * 100 < self.blank_threshold
+
+    # The share of the pixels of a grey image that are much darker than the paper,
+    # taken as the brightness that 95% of the pixels are at or below
+    @classmethod
+    def ink_share(cls, pix):
+        histogram = Image.frombytes("L", (pix.width, pix.height), pix.samples).histogram()
+        total = sum(histogram)
+        if total == 0:
+            return 0.0
+        count = 0
+        for paper, pixels in enumerate(histogram):
+            count += pixels
+            if count >= total * 0.95:
+                break
+        return sum(histogram[:max(0, paper - cls.ink_contrast)]) / total
+
+    def _batch_blank(self, page):
+        blank = self.looks_blank(page)
+        if self.blank_threshold is not None:
+            self.batch_blank[page.number] = blank
+        return blank
+
+    # Embedded text of a page, which may already have been extracted while batching
+    @Tracer.traced("page_text")
+    def page_text(self, page):
+        if page.number in self.batch_text:
+            return self.batch_text.pop(page.number)
+        return page.getText()
+
+    # Scans of empty sheets are not read, and None is returned for them. A page is 
+    # only looked at for ink once it has not been found in the cache
+    def read(self, page):
+        if page.number in self.batch_ocr:
+            text, self.from_cache = self.batch_ocr.pop(page.number)
+            return text
+        self.from_cache = False
+        if page.number in self.batch_keys:
+            key = self.batch_keys.pop(page.number)
+        else:
+            key, text = self.cache_lookup(page)
+            if text is not None:
+                self.from_cache = True
+                return text
+        if self.looks_blank(page):
+            return None
+        self.failed = False
+        if self.in_memory:
+            text = self.read_memory(page)
+        else:
+            text = self.read_file(page)
+        self.cache_store(key, text)
+        return text
 
-            # make all apostrophes the same
-            text_clean = re.sub(r"[‘’‚‛′`']", r"'", text_clean)
+    def read_batch(self, pages):
+        keys = dict()
+        pages_uncached = list()
+        for page in pages:
+            key, text = self.cache_lookup(page)
+            if text is not None:
+                self.batch_ocr[page.number] = (text, True)
+                continue
+            self.batch_keys[page.number] = key
+            if not self._batch_blank(page):
+                keys[page.number] = key
+                pages_uncached.append(page)
+        if len(pages_uncached) == 0:
+            return
+        self.failed = False
+        if self.in_memory:
+            texts = self.read_batch_memory(pages_uncached)
+        else:
+            texts = self.read_batch_file(pages_uncached)
+        # Tesseract ends every page with a form feed, fall back to single pages if the
+        # output cannot be matched up with the pages of the batch
+        texts = texts.split("\f")
+        if len(texts) > 0 and len(texts[-1].strip()) == 0:
+            texts.pop()
+        if len(texts) == len(pages_uncached):
+            for page, text in zip(pages_uncached, texts):
+                self.batch_ocr[page.number] = (text, False)
+                self.cache_store(keys[page.number], text)
+                del self.batch_keys[page.number]
+
+    # Identify a page by everything that goes into its image, without rendering it
+    def cache_key(self, page):
+        pdf = page.parent
+        key = hashlib.sha256()
+        key.update(repr((
+            tuple(page.rect),
+            page.rotation,
+            self.zoom_for(page),
+            self.scan_image(page),
+            "gray",
+            self.lang,
+            self.psm,
+            self.in_memory,
+            page.getFontList()
+        )).encode("utf-8"))
+        key.update(page.readContents())
+        for xref in [item[0] for item in pdf.getPageXObjectList(page.number)]:
+            key.update(pdf.xrefStreamRaw(xref) or b"")
+        for image in page.getImageList(full=True):
+            key.update(pdf.xrefStreamRaw(image[0]) or b"")
+            if image[1] > 0:
+                key.update(pdf.xrefStreamRaw(image[1]) or b"")
+        return key.hexdigest()
+
+    def cache_lookup(self, page):
+        if self.cache is None:
+            return None, None
+        key = self.cache_key(page)
+        return key, self.cache.get(key)
+
+    # Failed OCR is not cached, so it is tried again next time
+    def cache_store(self, key, text):
+        if self.cache is not None and not self.failed:
+            self.cache.put(key, text)
+
+    # Choose how much to enlarge a page for OCR, either by the fixed zoom or to
+    # reach the chosen resolution
+    def zoom_for(self, page):
+        if self.dpi < 1:
+            return self.zoom
+        dpi = self.dpi
+        # Rendering finer than the scan of the page adds pixels but no detail
+        native_dpi = self.native_dpi(page)
+        if native_dpi is not None:
+            dpi = max(min(dpi, native_dpi), min(self.dpi, self.dpi_min))
+        zoom = dpi / 72
+        area = abs(page.rect)
+        if area > 0 and area * zoom * zoom > self.pixel_limit:
+            zoom = math.sqrt(self.pixel_limit / area)
+        return zoom
+
+    # The highest resolution of the images that cover a page, if it has any, as
+    # smaller images such as logos say nothing about the text around them
+    def native_dpi(self, page):
+        native_dpi = None
+        page_area = abs(page.rect)
+        for image in page.getImageList(full=True):
+            try:
+                bbox = page.getImageBbox(image)
+            except ValueError:
+                continue
+            if bbox.isEmpty or bbox.isInfinite:
+                continue
+            if abs(bbox & page.rect) < page_area * self.image_coverage:
+                continue
+            # Images may be placed sideways, so compare their longest sides
+            image_dpi = max(image[2], image[3]) / (max(bbox.width, bbox.height) / 72)
+            native_dpi = image_dpi if native_dpi is None else max(native_dpi, image_dpi)
+        return native_dpi
+
+    # The numbers of the image blocks on a page that are big enough to hold text
+    # and have no text layer over them
+    def image_regions(self, page, blocks):
+        text_rects = [fitz.Rect(block[:4]) for block in blocks if block[6] == 0]
+        regions = dict()
+        for block in blocks:
+            if block[6] != 1:
+                continue
+            rect = fitz.Rect(block[:4]) & page.rect
+            if rect.width < self.region_min_size or rect.height < self.region_min_size:
+                continue
+            covered = sum(abs(rect & text_rect) for text_rect in text_rects)
+            if covered < abs(rect) * self.region_text_coverage:
+                regions[block[5]] = rect
+        return regions
+
+    # OCR areas of a page, rendered the same way as whole pages
+    def read_regions(self, page, regions):
+        page_key = self.cache_key(page) if self.cache is not None else None
+        texts = list()
+        for rect in regions.values():
+            key = text = None
+            if page_key is not None:
+                key = "{}:{}".format(page_key, tuple(rect))
+                text = self.cache.get(key)
+            if text is None:
+                self.failed = False
+                pix = self.render(page, clip=rect)
+                text = self.recognise(pix.getImageData("pnm"), pix.xres)
+                self.cache_store(key, text)
+            texts.append(text)
+        return texts
+
+    # The image of a page for OCR, taken from the scan itself where possible
+    def page_image(self, page):
+        xref = self.scan_image(page)
+        if xref is not None:
+            pix = self.extract_image(page, xref)
+            if pix is not None:
+                return pix
+        return self.render(page)
+
+    # The image on a page that is nothing but one upright scan, if it is one
+    def scan_image(self, page):
+        if not self.extract or page.rotation != 0:
+            return None
+        images = page.getImageList(full=True)
+        # Images with a soft mask are blended with what is behind them
+        if len(images) != 1 or images[0][1] != 0:
+            return None
+        try:
+            bbox, transform = page.getImageBbox(images[0], transform=True)
+        except ValueError:
+            return None
+        # Turned or mirrored images would have to be turned back first
+        if transform.b != 0 or transform.c != 0 or transform.a <= 0 or transform.d <= 0:
+            return None
+        page_area = abs(page.rect)
+        if page_area == 0 or abs(bbox & page.rect) < page_area * self.image_coverage:
+            return None
+        return images[0][0]
+
+    # Decode the scan of a page to grey, marked with the resolution it has on the page
+    @Tracer.traced("extract_image")
+    def extract_image(self, page, xref):
+        try:
+            pix = fitz.Pixmap(page.parent, xref)
+            if pix.alpha:
+                pix = fitz.Pixmap(pix, 0)
+            if pix.colorspace is None:
+                return None
+            if pix.n != 1:
+                pix = fitz.Pixmap(fitz.csGRAY, pix)
+        except RuntimeError:
+            return None
+        resolution = round(self.native_dpi(page))
+        pix.setResolution(resolution, resolution)
+        return pix
+
+    # Generate pixmap from PDF page
+    @Tracer.traced("render")
+    def render(self, page, clip=None):
+        zoom = self.zoom_for(page)
+        zoom_matrix = fitz.Matrix(zoom, zoom)
+        pix = page.getPixmap(matrix=zoom_matrix, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+        # Pixmaps are marked as 96 DPI whatever their zoom, which the fixed zoom has
+        # always passed on to Tesseract
+        if self.dpi > 0:
+            resolution = round(zoom * 72)
+            pix.setResolution(resolution, resolution)
+        return pix
+
+    # Save the page image as a temporary PNG file and OCR the file
+    def read_file(self, page):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            pix = self.page_image(page)
+            img = os.path.join(temp_dir,"page-{}.png".format(page.number))
+            pix.writePNG(img)
+            text = self.recognise_file(img)
+        return text
 
-            #connect hyphenated line breaks
-            text_clean = re.sub(r"\S-\s+", lambda x: x.group(0)[0], text_clean)
+    # Hand the uncompressed page image to Tesseract directly, without touching the disk
+    def read_memory(self, page):
+        pix = self.page_image(page)
+        return self.recognise(pix.getImageData("pnm"), pix.xres)
 
-            # Remove non-grammatical punctuation
-            text_clean = re.sub(r'''[^a-zA-Z0-9' .;,"$/@!?&\-()_]''', r"", text_clean)
+    # Save the page images and pass Tesseract a list of the files
+    def read_batch_file(self, pages):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            images = list()
+            for page in pages:
+                pix = self.page_image(page)
+                images.append(os.path.join(temp_dir,"page-{}.png".format(page.number)))
+                pix.writePNG(images[-1])
+            image_list = os.path.join(temp_dir, "pages.txt")
+            with open(image_list, "w") as image_list_file:
+                image_list_file.write("\n".join(images) + "\n")
+            text = self.recognise_file(image_list)
+        return text
 
-            # clean words split up by spaces
-            text_clean = re.sub(r"(\b\w\s)+", self.strip_whitespace, text_clean)
+    # Combine the uncompressed page images into a multi-page TIFF for Tesseract.
+    # Extracted scans keep their own resolution, and Tesseract takes a single resolution
+    # for all pages, so pages are sent in one TIFF for each resolution
+    def read_batch_memory(self, pages):
+        images = collections.defaultdict(list)
+        for i, page in enumerate(pages):
+            pix = self.page_image(page)
+            images[(pix.xres, pix.yres)].append(
+                (i, Image.frombytes("L", (pix.width, pix.height), pix.samples))
+            )
+        texts = [None] * len(pages)
+        for (xres, yres), group in images.items():
+            image_data = io.BytesIO()
+            group[0][1].save(
+                image_data,
+                format="TIFF",
+                save_all=True,
+                append_images=[image for i, image in group[1:]],
+                dpi=(xres, yres)
+            )
+            group_texts = self.recognise(image_data.getvalue(), xres).split("\f")
+            if len(group_texts) > 0 and len(group_texts[-1].strip()) == 0:
+                group_texts.pop()
+            # Let read_batch fall back to single pages
+            if len(group_texts) != len(group):
+                return ""
+            for (i, image), text in zip(group, group_texts):
+                texts[i] = text
+        return "".join(text + "\f" for text in texts)
+
+    @Tracer.traced("tesseract")
+    def recognise_file(self, img):
+        try:
+            text = pytesseract.image_to_string(img, lang=self.lang, config=f"--psm {self.psm}")
+        except:
+            self.error_found()
+            text = ""
+        return text
 
-            # fix spaces
-            text_clean = re.sub(r"\s+", " ", text_clean)
-            text_clean = re.sub(r"\s[.,;]", lambda x: x.group(0)[1], text_clean)
+    # PNM images carry no resolution, so pass on the one a PNG file would have recorded
+    @Tracer.traced("tesseract")
+    def recognise(self, image_data, dpi):
+        try:
+            result = subprocess.run(
+                [
+                    pytesseract.pytesseract.tesseract_cmd, "stdin", "stdout",
+                    "-l", self.lang, "--psm", str(self.psm), "--dpi", str(dpi)
+                ],
+                input=image_data,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                check=True
+            )
+            text = result.stdout.decode("utf-8")
+        except (OSError, subprocess.CalledProcessError):
+            self.error_found()
+            text = ""
+        return text
 
-            # common splits
-            text_clean = re.sub(
-                r"(?i)\bt\s?h\s?e\b", 
-                lambda x: x.group(0)[0]+"he", 
-                text_clean
+    def error_found(self):
+        self.failed = True
+        print(("\rSorry! There appears to be an issue with your Tesseract OCR installation. "
+        "Please refer to the instruction manual for more details."))
+
+class SQLiteCache:
+
+    # Caches already opened by this process, so each process keeps a single connection
+    opened = dict()
+
+    # A table of text values in an SQLite file, which removes the least recently used
+    # values once their combined size grows beyond the size limit (in bytes)
+    def __init__(self, path, table, size_limit):
+        self.path = path
+        self.table = table
+        self.size_limit = size_limit
+        self.hits = 0
+        self.misses = 0
+        # Values added and used since the last flush, written together in one transaction
+        self.pending = dict()
+        self.touched = dict()
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value TEXT, size INTEGER, used REAL)"
+        )
+        self.connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_used ON {table} (used)")
+        self.connection.commit()
+        self.size = self._total_size()
+
+    @classmethod
+    def open(cls, path, table, size_limit):
+        key = (os.getpid(), os.path.abspath(path), table)
+        if key not in cls.opened:
+            cls.opened[key] = cls(path, table, size_limit)
+        return cls.opened[key]
+
+    # Write what every cache opened by this process has added or used since the last flush
+    @classmethod
+    def flush_opened(cls):
+        for (pid, path, table), cache in cls.opened.items():
+            if pid == os.getpid():
+                cache.flush()
+
+    def _total_size(self):
+        return self.connection.execute(
+            f"SELECT COALESCE(SUM(size), 0) FROM {self.table}"
+        ).fetchone()[0]
+
+    def get(self, key):
+        if key in self.pending:
+            self.hits += 1
+            value, size, used = self.pending[key]
+            self.pending[key] = (value, size, time.time())
+            return value
+        row = self.connection.execute(
+            f"SELECT value FROM {self.table} WHERE key = ?", 
+            (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.touched[key] = time.time()
+        return row[0]
+
+    def put(self, key, value):
+        size = len(value.encode("utf-8"))
+        self.pending[key] = (value, size, time.time())
+        self.size += size
+        if self.size > self.size_limit:
+            self.evict()
+
+    def flush(self):
+        if len(self.pending) == 0 and len(self.touched) == 0:
+            return
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, used) VALUES (?, ?, ?, ?)",
+                [(key, value, size, used) for key, (value, size, used) in self.pending.items()]
             )
-            text_clean = re.sub(
-                r"\ba\s?n\s?d\b", 
-                lambda x: x.group(0)[0]+"nd", 
-                text_clean
+            self.connection.executemany(
+                f"UPDATE {self.table} SET used = ? WHERE key = ?", 
+                [(used, key) for key, used in self.touched.items()]
             )
+        self.pending = dict()
+        self.touched = dict()
+
+    # Remove the least recently used values until the cache is back to 90% of the limit
+    def evict(self):
+        self.flush()
+        # Other processes may have added to the cache as well
+        self.size = self._total_size()
+        target = self.size_limit * 0.9
+        expired = list()
+        for key, size in self.connection.execute(
+            f"SELECT key, size FROM {self.table} ORDER BY used"
+        ):
+            if self.size <= target:
+                break
+            expired.append((key,))
+            self.size -= size
+        with self.connection:
+            self.connection.executemany(f"DELETE FROM {self.table} WHERE key = ?", expired)
+
+class Manifest:
+
+    # Keeps every file read into an output in an SQLite file next to it, along with its
+    # size, modification time and content hash and the options it was read with
+    def __init__(self, path, options):
+        self.path = path
+        self.options = options
+        # Checkpoints are removed once the outputs are written, see ProcessPDF
+        self.checkpoint = False
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS files "
+            "(path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT, options TEXT, file BLOB)"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def hash_file(path):
+        file_hash = hashlib.sha256()
+        with open(path, "rb") as pdf_file:
+            for block in iter(lambda: pdf_file.read(1024 * 1024), b""):
+                file_hash.update(block)
+        return file_hash.hexdigest()
+
+    # Return the files that have not changed since they were saved, by path
+    def load(self, path_list):
+        files = dict()
+        rows = self.connection.execute("SELECT path, size, mtime, hash, options FROM files")
+        entries = {row[0] : row[1:] for row in rows}
+        with self.connection:
+            # Files that are gone from the input are dropped from the outputs
+            self.connection.executemany(
+                "DELETE FROM files WHERE path = ?",
+                [(path,) for path in entries if path not in path_list]
+            )
+            for path in path_list:
+                if path not in entries:
+                    continue
+                size, mtime, file_hash, options = entries[path]
+                stat = os.stat(path)
+                if options != self.options or stat.st_size != size:
+                    continue
+                # A file that was only touched or copied keeps its contents
+                if stat.st_mtime != mtime:
+                    if self.hash_file(path) != file_hash:
+                        continue
+                    self.connection.execute(
+                        "UPDATE files SET mtime = ? WHERE path = ?", 
+                        (stat.st_mtime, path)
+                    )
+                row = self.connection.execute(
+                    "SELECT file FROM files WHERE path = ?", 
+                    (path,)
+                ).fetchone()
+                f = pickle.loads(row[0])
+                f.from_manifest = True
+                files[path] = f
+        return files
+
+    def save(self, files):
+        with self.connection:
+            for f in files:
+                stat = os.stat(f.path)
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        f.path, 
+                        stat.st_size, 
+                        stat.st_mtime, 
+                        self.hash_file(f.path), 
+                        self.options, 
+                        pickle.dumps(f)
+                    )
+                )
+
+    def remove(self):
+        self.connection.close()
+        os.remove(self.path)
+
+class Plan:
+
+    # Classify every page of the input, then time text extraction on a few text pages
+    # and OCR on one page to estimate how long reading everything will take
+    def __init__(self, container):
+        self.args = container.args
+        self.workers = container.workers
+        self.files = list()
+        sample_text = list()
+        sample_ocr = None
+        for path in container.path_list:
+            try:
+                pdf = File.open_pdf(path)
+            except PDFOpenError:
+                continue
+            kinds = collections.Counter()
+            ocr_count = 0
+            for page in pdf:
+                if len(self.args["pages"]) > 0 and page.number not in self.args["pages"]:
+                    continue
+                kind = PageClassifier.classify(page)
+                kinds[kind] += 1
+                if PageClassifier.needs_ocr(kind, self.args):
+                    ocr_count += 1
+                    if sample_ocr is None:
+                        sample_ocr = (path, page.number)
+                elif kind != "blank" and len(sample_text) < 10:
+                    sample_text.append((path, page.number))
+            pdf.close()
+            self.files.append((path, kinds, ocr_count))
+        self.page_count = sum(sum(kinds.values()) for path, kinds, ocr_count in self.files)
+        self.ocr_count = sum(ocr_count for path, kinds, ocr_count in self.files)
+        self.text_count = sum(
+            sum(kinds.values()) - kinds["blank"] - ocr_count 
+            for path, kinds, ocr_count in self.files
+        )
+        self.time_text = self._time_text(sample_text)
+        self.time_ocr = self._time_ocr(sample_ocr)
+        self.time = (
+            self.text_count * self.time_text + self.ocr_count * self.time_ocr
+        ) / max(1, min(self.workers, len(self.files)))
+
+    def _time_text(self, sample):
+        if len(sample) == 0:
+            return 0.0
+        time_start = time.perf_counter()
+        for path, page_number in sample:
+            with fitz.open(path) as pdf:
+                pdf[page_number].getText()
+        return (time.perf_counter() - time_start) / len(sample)
+
+    # Timed without the OCR cache, which a new page would not be in
+    def _time_ocr(self, sample):
+        if sample is None:
+            return 0.0
+        path, page_number = sample
+        ocr_engine = OCREngine(**dict(self.args, ocr_cache=None))
+        time_start = time.perf_counter()
+        with fitz.open(path) as pdf:
+            pix = ocr_engine.page_image(pdf[page_number])
+            ocr_engine.recognise(pix.getImageData("pnm"), pix.xres)
+        return time.perf_counter() - time_start
 
-            # remove leading and trailing spaces
-            text_clean = text_clean.strip()
-
-            return text_clean
-    def strip_whitespace(self, text):
-            text_new = ""
-            for c in text.group(0):
-                if not re.match(r"\s", c):
-                    text_new += c
-            text_new += " "
-            return text_new
-    
 class ProcessPDF(ReadPDF):
     def __init__(self, user_args=""):
 
         super().__init__(user_args)
 
+        # Nothing has been read for a plan
+        if self.args["plan"]:
+            return
+        if self.stream is not None:
+            self.stream.close()
         self.time_read = self.time
         time_start = time.perf_counter()
-        self.text_whole = " ".join([str(f.text_whole) for f in self.files])
-        self.report = MergedFrequencyReport(
-            [
-                f.report for f in self.files if len(f.report.report) > 0
-            ], 
-            **self.args
-        )
+        self.text_whole = " ".join([str(f.text_whole) for f in self.files if not f.released])
+        self.correction_hits = sum(f.correction_hits for f in self.files_read)
+        self.correction_misses = sum(f.correction_misses for f in self.files_read)
+        reports = [f.report for f in self.files if hasattr(f, "report") and len(f.report.counts) > 0]
+        if self.stream is not None:
+            reports.append(self.stream.report)
+        self.report = MergedFrequencyReport(reports, **self.args)
         time_end = time.perf_counter()
         self.time_process = sum([f.time_process for f in self.files]) + (time_end - time_start)
         self.time += self.time_process
+        self.dialog.correction_summary()
         self.dialog.end_container()
 
+    def _open_stream(self):
+        if not self.args["stream_output"]:
+            return None
+        # Files kept in the manifest need all their pages
+        if self.args["incremental"]:
+            self.dialog.stream_unused("files kept for incremental runs need all their pages")
+            return None
+        return StreamWriter(self)
+
+    def _open_manifest(self):
+        if self.args["incremental"] or not self.args["resume"]:
+            return super()._open_manifest()
+        # Only a folder is worth resuming, and streamed files have already been written
+        if self.input_type != "dir":
+            self.dialog.resume_unused("only a folder of files can be resumed")
+            return None
+        if self.args["stream_output"]:
+            self.dialog.resume_unused("streamed files are written as soon as they are read")
+            return None
+        manifest = Manifest(
+            f"{self._output_basename()}-checkpoint.db", 
+            self._options_fingerprint()
+        )
+        manifest.checkpoint = True
+        self.dialog.checkpoint_opened(manifest.path)
+        return manifest
+
     def _read_files(self):
-        return [FileProcessed(path, self.dialog, **self.args) for path in self.path_list]
+        return super()._read_files(FileProcessed)
     
     def write(self):
+        if self.args["plan"]:
+            return
         if self.args["split"]:
             outputs = self.files
         else:
             outputs = [self]
         for container in outputs:
             writer = CSVWriter(container)
-            writer.write_content()
+            # Streamed text and corrections have already been written while reading
+            if self.stream is None:
+                writer.write_content()
             if any([
                 self.args["report"], 
                 self.args["report_file"], 
                 self.args["report_page"]
             ]):
                 writer.write_report()
-            if self.args["corrections"]:
+            if self.args["corrections"] and self.stream is None:
                 writer.write_corrections()
+        # The run is complete, so there is nothing left to resume
+        if self.manifest is not None and self.manifest.checkpoint:
+            self.manifest.remove()
+            self.manifest = None
+        self.finish_trace()
+
 class FileProcessed(File):
-    def __init__(self, file_path, dialog, **args):
-        super().__init__(file_path, dialog, **args)
+    def __init__(self, file_path, dialog, page_list=None, stream=None, **args):
+        super().__init__(file_path, dialog, page_list, stream, **args)
         self.time_read = self.time
         time_start = time.perf_counter()
-        self.text_whole = " ".join([str(page.text_whole) for page in self.pages])
+        self.text_whole = " ".join(
+            [str(page.text_whole) for page in self.pages if not page.released]
+        )
+        self.correction_hits = sum(page.correction_hits for page in self.pages)
+        self.correction_misses = sum(page.correction_misses for page in self.pages)
         self.report = MergedFrequencyReport(
             [
                 page.report for page in self.pages if hasattr(page, "report")
@@ -740,12 +2261,31 @@ class FileProcessed(File):
         self.dialog.end_file()
         
 
-    def _read_pages(self):
-        return [PageProcessed(page, self.pdf, self.dialog, **self.args) for page in self.pdf]
+    @classmethod
+    def _iter_page_range(cls, pdf, start, stop, dialog, **args):
+        ocr_engine = OCREngine(**args)
+        for page in ocr_engine.iter_pages(pdf, start, stop):
+            page = PageProcessed(page, pdf, dialog, ocr_engine, **args)
+            if not Page.text_needed(args):
+                page.drop_text()
+            if Tracer.enabled:
+                page.spans = Tracer.take(
+                    file=os.path.basename(pdf.name), 
+                    page=page.page_number + 1
+                )
+            yield page
+
+    def release(self):
+        super().release()
+        self.text_whole = ""
+        # Page reports are already added up in the file report, see StreamWriter.end_file
+        if not self.args["report_page"]:
+            for page in self.pages:
+                page.__dict__.pop("report", None)
 
 class PageProcessed(Page):
-    def __init__(self, page, pdf, dialog, **args):
-        super().__init__(page, pdf, dialog, **args)
+    def __init__(self, page, pdf, dialog, ocr_engine=None, **args):
+        super().__init__(page, pdf, dialog, ocr_engine, **args)
         self.tools = ProcessingTools()
         self.dialog = dialog
         self.dialog.page = self
@@ -756,12 +2296,15 @@ class PageProcessed(Page):
         start_time = time.perf_counter()
         if not self.skipped:
             self._process_page()
+        self.correction_hits = self.tools.correction_hits
+        self.correction_misses = self.tools.correction_misses
         end_time = time.perf_counter()
         self.time_process = end_time - start_time
         self.dialog.page_process()
         self.time = self.time_read + self.time_process
         self.dialog.page_complete()
 
+    @Tracer.traced("process_page")
     def _process_page(self):
         if not self.skipped:
             if self.args["autocorrect"]:
@@ -787,36 +2330,34 @@ class PageProcessed(Page):
                 self.report = FrequencyReport(self.text, **self.args)
             self.text_whole = self.text
             if self.args["process_only"] is not None:
-                word_list = self.tools._get_word_list(
+                matcher = self.tools._get_matcher(
                     self.args["process_only"], 
                     self.tools.only_file
                 )
-                self.words_only(word_list)
+                self.words_only(matcher)
             
             if self.args["process_ignore"] is not None:
-                word_list = self.tools._get_word_list(
+                matcher = self.tools._get_matcher(
                     self.args["process_ignore"], 
-                    self.tools.ignore_file
-                )
-                word_list = self.tools._default_stop_words(
-                    word_list, 
+                    self.tools.ignore_file,
                     self.tools.stop_words_file
                 )
-                self.words_ignore(word_list)
-            self.output_data["Text"] = self.text
+                self.words_ignore(matcher)
+            if "Text" in self.output_data:
+                self.output_data["Text"] = self.text
 
     def correct(self):
-        correct = self.tools.autocorrect(self.text, "correct")
+        correct = self.tools.autocorrect(self.text, "correct", **self.args)
         self.text = correct[0]
         self.corrected_words = correct[1]
 
     def correct_and_remove(self):
-        correct = self.tools.autocorrect(self.text, "correct+remove")
+        correct = self.tools.autocorrect(self.text, "correct+remove", **self.args)
         self.text = correct[0]
         self.corrected_words = correct[1]
 
     def remove_typos(self):
-        correct = self.tools.autocorrect(self.text, "remove")
+        correct = self.tools.autocorrect(self.text, "remove", **self.args)
         self.text = correct[0]
         self.corrected_words = correct[1]
 
@@ -832,43 +2373,45 @@ class PageProcessed(Page):
     def lowercase(self):
         self.text = self.text.lower()
 
-    def words_only(self, word_list):
+    def words_only(self, matcher):
         self.text_whole = self.text
-        self.text = self.tools.words_only(self.text, word_list)
+        self.text = self.tools.words_only(self.text, matcher)
     
-    def words_ignore(self, word_list):
+    def words_ignore(self, matcher):
         self.text_whole = self.text
-        self.text = self.tools.words_ignore(self.text, word_list)
+        self.text = self.tools.words_ignore(self.text, matcher)
 
     def tokenize_sentences(self):
+        sentences = TextBlob(str(self.text)).sentences
         self.output_data_whole = self.output_data.copy()
         self.output_data.update(
             {
                 "Sentence Number" : [
                     i + 1 
-                    for i in range(len(self.text.sentences))
+                    for i in range(len(sentences))
                 ],
                 "Word Count" : [
-                    len(sentence.words) for sentence in self.text.sentences
+                    len(sentence.words) for sentence in sentences
                 ],
-                "Text" : self.text.sentences,
-                "Raw Text" : self.text_whole.sentences
+                "Text" : sentences,
+                "Raw Text" : TextBlob(str(self.text_whole)).sentences
             }
         )
     
     def tokenize_words(self):
+        words = TextBlob(str(self.text)).words
         self.output_data_whole = self.output_data.copy()
         self.output_data.update(
             {
                 "Word Number" : [
                     i + 1
-                    for i in range(len(self.text.words))
+                    for i in range(len(words))
                 ],
                 "Word Length" : [
-                    len(word) for word in self.text.words
+                    len(word) for word in words
                 ],
-                "Text" : self.text.words,
-                "Raw Text" : self.text_whole.words
+                "Text" : words,
+                "Raw Text" : TextBlob(str(self.text_whole)).words
             }
         )
 
@@ -876,10 +2419,17 @@ class PageProcessed(Page):
         if hasattr(self, "output_data_whole"):
             self.output_data = self.output_data_whole
 
+    # Corrections are written along with the page, see CSVWriter.write_page
+    def release(self):
+        super().release()
+        self.corrected_words = []
+
 class ProcessingTools:
 
     def __init__(self):
         self._default_word_list_files()
+        self.correction_hits = 0
+        self.correction_misses = 0
 
     def _dictionary_process(self, **args):
         d = BuildDict()
@@ -936,6 +2486,12 @@ class ProcessingTools:
         else:
             return [default_file]
 
+    def _get_matcher(self, word_list, default_file, stop_words_file=None):
+        return WordListMatcher.open(
+            self._get_word_list(word_list, default_file), 
+            stop_words_file
+        )
+
     def _default_stop_words(self, word_list, stop_words_file):
         if os.path.isfile(word_list[0]):
             with open(word_list[0], "r") as read_file:
@@ -943,18 +2499,20 @@ class ProcessingTools:
                     word_list = [stop_words_file]
         return word_list
 
-    def autocorrect(self, text, mode="correct"):
-        text = self._blobify(text)
-        text_corrected = TextBlob("")
+    @Tracer.traced("autocorrect")
+    def autocorrect(self, text, mode="correct", **args):
+        text_corrected = list()
         words_corrected = list()
-        spelling = Spelling(
-            path=BuildDict.path_custom_dict if os.path.exists(BuildDict.path_custom_dict) 
-            else BuildDict.path_ref_dict
+        spelling = SpellingIndex.open(
+            cache=args.get("correction_cache"), 
+            cache_size=args.get("correction_cache_size", 100) * 1024 * 1024
         )
+        memo_hits = spelling.memo_hits
+        memo_misses = spelling.memo_misses
         
-        for word in [p.split("/")[0] for p in re.sub(r"\n", " ", text.parse()).split(" ")]:
+        for word in self._tokenize(text):
             word_lowercase = word.lower()
-            if True not in [True if c.isalnum() else False for c in word]:
+            if not any(c.isalnum() for c in word):
                 check = [(word, -1)]
                 separator = ""
             else:
@@ -962,15 +2520,14 @@ class ProcessingTools:
                 if not word.isalpha():
                     check = [(word, -2)]
                 else:
-                    
-                    check = spelling.suggest(word_lowercase)
+                    check = [spelling.correct(word_lowercase)]
             corrected = check[0][0]
             if word.isupper():
                 corrected = corrected.upper()
             elif word.istitle():
                 corrected = corrected.title()
             if "correct" in mode:
-                if len(list(spelling._known([word.lower()]))) == 0 and check[0][1] > -1:
+                if not spelling.known(word_lowercase) and check[0][1] > -1:
                     words_corrected.append(
                         [word, True if check[0][1]>0 else False, 
                         corrected if check[0][1]>0 else "", 
@@ -978,41 +2535,58 @@ class ProcessingTools:
                     )
                 if mode == "correct+remove":
                     if check[0][1] > 0 or check[0][1] == -1:
-                        text_corrected += separator + corrected
+                        text_corrected.append(separator + corrected)
                 else:
-                    text_corrected += separator + corrected
+                    text_corrected.append(separator + corrected)
             elif mode == "remove":
-                if len(list(spelling._known([word.lower()]))) != 0 or check[0][1] == -1:
-                    text_corrected += separator + corrected
-        return (text_corrected.strip(), words_corrected)
+                if spelling.known(word_lowercase) or check[0][1] == -1:
+                    text_corrected.append(separator + corrected)
+        self.correction_hits += spelling.memo_hits - memo_hits
+        self.correction_misses += spelling.memo_misses - memo_misses
+        return (TextBlob("".join(text_corrected).strip()), words_corrected)
+
+    # Autocorrect only needs the words of the text, so they are split from the text
+    # without the part-of-speech tagging and chunking a full TextBlob.parse() does
+    def _tokenize(self, text):
+        return re.sub(r"\n", " ", parse(str(text), tags=False, chunks=False)).split(" ")
+
+    # Words and their part-of-speech tags, which are the same as TextBlob.parse() gives,
+    # as chunking never changes a tag
+    def _tag(self, text):
+        return [
+            tuple(token.split("/")) if "/" in token else (token, None)
+            for token in re.sub(r"\n", " ", parse(str(text), chunks=False)).split(" ")
+        ]
 
+    @Tracer.traced("lemmatize")
     def lemmatize(self, text):
-        
-        blob = self._blobify(text)
-        text = ""
-        for w in re.sub(r"\n", " ", blob.parse()).split(" "):
-            if "/" in w:
-                if w.split("/")[1][:2] == "JJ":
+        text_lemmatized = list()
+        for word, tag in self._tag(text):
+            if tag is not None:
+                if tag[:2] == "JJ":
                     pos = 'a'
-                elif "RB" in w.split("/")[1]:
+                elif "RB" in tag:
                     pos = 'r'
-                elif w.split("/")[1][:2] == "VB":
+                elif tag[:2] == "VB":
                     pos = 'v'
                 else:
                     pos = 'n'
-                text += "{}".format(
-                    " " if True in [True if c.isalnum() else False for c in w.split("/")[0]] else ""
-                ) + Word(w.split("/")[0]).lemmatize(pos) 
+                text_lemmatized.append(
+                    (" " if any(c.isalnum() for c in word) else "") 
+                    + Word(word).lemmatize(pos)
+                )
             else:
-                text += w
-        return TextBlob(text.strip())
+                text_lemmatized.append(word)
+        return TextBlob("".join(text_lemmatized).strip())
 
+    @Tracer.traced("remove_punctuation")
     def remove_punctuation(self, text):
         blob = self._blobify(text)
         text_new = " ".join(blob.words)
         text_new = re.sub(r"[^\w\s'-]|_|\^|\\", "", text_new)
         return TextBlob(text_new)
 
+    @Tracer.traced("remove_numbers")
     def remove_numbers(self, text):
         text = str(text)
         text = re.sub(r"\d", "", text) 
@@ -1036,37 +2610,233 @@ class ProcessingTools:
 
         return patterns
 
-    def words_only(self, text, word_list):
-        patterns = self._get_pattern(word_list)
-        text_old = str(text)
-        text_new = ""
-        # Only include specified words
-        for pattern in patterns:
-            matches  = re.findall(r"\b{}\b".format(pattern), text_old, flags=re.IGNORECASE)
-            text_new += " " + " ".join(matches)
+    @Tracer.traced("words_only")
+    def words_only(self, text, matcher):
+        text_new = matcher.only(str(text))
         text_new = re.sub(r"\s\s+", " ", text_new) # Fix double spaces
         text_new = text_new.strip()
         return TextBlob(text_new)
     
-    def words_ignore(self, text, word_list):
-        patterns = self._get_pattern(word_list)
-        text = str(text)
-        # Remove specified words
-        for pattern in patterns:
-            text = re.sub(r"\b{}\b".format(pattern), "", text, flags=re.IGNORECASE)
+    @Tracer.traced("words_ignore")
+    def words_ignore(self, text, matcher):
+        text = matcher.ignore(str(text))
         text = re.sub(r"\s\s+", " ", text) # Fix double spaces
         text = text.strip()
         return TextBlob(text)
 
+class WordListMatcher:
+
+    # Word lists already compiled by this process, by their words and the age of their files
+    loaded = dict()
+    backreference = re.compile(r"\\[1-9]|\(\?P=")
+
+    # Finds all the words and patterns of a word list in a single pass over a text.
+    # Plain words are looked up in a set, everything else is combined into one expression
+    def __init__(self, patterns):
+        # Blank lines in a word list file match nothing
+        self.patterns = [pattern for pattern in patterns if len(pattern) > 0]
+        self.words = dict()
+        for i, pattern in enumerate(self.patterns):
+            if re.fullmatch(r"\w+", pattern):
+                self.words.setdefault(pattern, i)
+        # Groups are numbered across the whole expression, so patterns that refer back
+        # to their own groups only work when they are compiled on their own
+        self.separate = {
+            i : re.compile(r"\b(?:{})\b".format(pattern), flags=re.IGNORECASE)
+            for i, pattern in enumerate(self.patterns) 
+            if pattern not in self.words and self.backreference.search(pattern)
+        }
+        expressions = [
+            f"(?P<p{i}>{pattern})" 
+            for i, pattern in enumerate(self.patterns) 
+            if pattern not in self.words and i not in self.separate
+        ]
+        # Any other word is matched whole, so that it can be checked against the set
+        expressions.append(r"(?P<word>\w+)")
+        self.expression = re.compile(
+            r"\b(?:{})\b".format("|".join(expressions)), 
+            flags=re.IGNORECASE
+        )
+
+    @classmethod
+    def open(cls, word_list, stop_words_file=None):
+        files = [
+            path for path in [word_list[0], stop_words_file] 
+            if path is not None and os.path.isfile(path)
+        ]
+        key = (tuple(word_list), stop_words_file, tuple(os.path.getmtime(path) for path in files))
+        if key not in cls.loaded:
+            tools = ProcessingTools()
+            if stop_words_file is not None:
+                word_list = tools._default_stop_words(word_list, stop_words_file)
+            cls.loaded[key] = cls(tools._get_pattern(word_list))
+        return cls.loaded[key]
+
+    # The position in the word list of the word or pattern found, if it is in the list
+    def _index(self, match):
+        if match.lastgroup == "word":
+            return self.words.get(match.group(0).lower())
+        return int(match.lastgroup[1:])
+
+    # Matches are grouped by their word or pattern, in the order of the list
+    def only(self, text):
+        matches = [list() for pattern in self.patterns]
+        for match in self.expression.finditer(text):
+            i = self._index(match)
+            if i is not None:
+                matches[i].append(match.group(0))
+        for i, expression in self.separate.items():
+            matches[i] = [match.group(0) for match in expression.finditer(text)]
+        return "".join(" " + " ".join(words) for words in matches)
+
+    def ignore(self, text):
+        text = self.expression.sub(
+            lambda match: "" if self._index(match) is not None else match.group(0), 
+            text
+        )
+        for expression in self.separate.values():
+            text = expression.sub("", text)
+        return text
+
+    # Whether a single word is in the list as a word or matches a pattern as a whole
+    def contains(self, word):
+        match = self.expression.fullmatch(word)
+        if match is not None and self._index(match) is not None:
+            return True
+        return any(expression.fullmatch(word) for expression in self.separate.values())
+
+class SpellingIndex:
+
+    # Spelling models already loaded by this process, by path and modification time
+    loaded = dict()
+    # The number of corrections each process keeps in memory
+    memo_size = 100000
+
+    # Gives the same suggestions as textblob's Spelling, but looks up words within two
+    # edits in an index of deletes instead of generating every possible edit of the word
+    def __init__(self, path):
+        self.path = path
+        self.spelling = Spelling(path=path)
+        self.spelling.load()
+        self.words = dict(self.spelling.items())
+        self._build_deletes()
+        # Corrections saved to disk are only valid for the dictionary they came from
+        with open(path, "rb") as dictionary_file:
+            self.fingerprint = hashlib.sha256(dictionary_file.read()).hexdigest()
+        self.memo = collections.OrderedDict()
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self.cache = None
+
+    # The custom dictionary is used whenever one has been built
+    @staticmethod
+    def path_default():
+        return (
+            BuildDict.path_custom_dict if os.path.exists(BuildDict.path_custom_dict) 
+            else BuildDict.path_ref_dict
+        )
+
+    @classmethod
+    def open(cls, path=None, cache=None, cache_size=0):
+        if path is None:
+            path = cls.path_default()
+        key = (os.path.abspath(path), os.path.getmtime(path))
+        if key not in cls.loaded:
+            cls.loaded[key] = cls(path)
+        index = cls.loaded[key]
+        if cache is not None and index.cache is None:
+            index.cache = SQLiteCache.open(cache, "corrections", cache_size)
+        return index
+
+    def known(self, word):
+        return word in self.words
+
+    # Map every dictionary word with up to two letters deleted back to the word
+    def _build_deletes(self):
+        self.deletes = dict()
+        for word in self.words:
+            if re.fullmatch(r"[a-z]+", word):
+                for delete in self._deletes(word):
+                    self.deletes.setdefault(delete, []).append(word)
+
+    def _deletes(self, word):
+        deletes = {word}
+        for i in range(len(word)):
+            delete = word[:i] + word[i + 1:]
+            deletes.add(delete)
+            deletes.update(delete[:j] + delete[j + 1:] for j in range(len(delete)))
+        return deletes
+
+    # Any two words that are two edits apart share a version with up to two letters
+    # deleted, so the index finds all of them, along with some that need checking
+    def _edit2(self, word):
+        edits = self.spelling._edit1(word)
+        candidates = {
+            candidate
+            for delete in self._deletes(word)
+            for candidate in self.deletes.get(delete, [])
+        }
+        return {
+            candidate for candidate in candidates 
+            if not edits.isdisjoint(self.spelling._edit1(candidate))
+        }
+
+    # The best suggestion for a word, remembered for the rest of the run and, 
+    # with a correction cache, for later runs with the same dictionary
+    def correct(self, word):
+        if word in self.memo:
+            self.memo.move_to_end(word)
+            self.memo_hits += 1
+            return self.memo[word]
+        correction = None
+        if self.cache is not None:
+            key = f"{self.fingerprint}:{word}"
+            value = self.cache.get(key)
+            if value is not None:
+                suggestion, confidence = value.split("\t")
+                correction = (suggestion, float(confidence))
+        if correction is None:
+            self.memo_misses += 1
+            correction = self.suggest(word)[0]
+            if self.cache is not None:
+                self.cache.put(key, f"{correction[0]}\t{correction[1]!r}")
+        else:
+            self.memo_hits += 1
+        self.memo[word] = correction
+        if len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+        return correction
+
+    def suggest(self, word):
+        # Words with other characters cannot be matched through the index
+        if len(word) == 1 or not re.fullmatch(r"[a-z]+", word):
+            return self.spelling.suggest(word)
+        if word in self.words:
+            candidates = {word}
+        else:
+            candidates = {
+                edit for edit in self.spelling._edit1(word) if edit in self.words
+            } or self._edit2(word) or [word]
+        # Score and order the candidates exactly as textblob does
+        candidates = [(self.words.get(c, 0.0), c) for c in candidates]
+        s = float(sum(p for p, c in candidates) or 1)
+        return [(c, p) for p, c in sorted(((p / s, c) for p, c in candidates), reverse=True)]
+
 class FrequencyReport:
 
+    @Tracer.traced("frequency_report")
     def __init__(self, source, user_args="", **args):
         if len(args) > 0:
             filepath = args["filepath"]
         else:
             filepath = "DEFAULT"
-        self.args = Arguments(" ".join([filepath,user_args])).args
-        self.args.update(args)
+        # Reports made while processing already have every option, so only
+        # parse the arguments again when there are new ones to add
+        if len(args) > 0 and len(user_args) == 0:
+            self.args = dict(args)
+        else:
+            self.args = Arguments(" ".join([f'"{filepath}"',user_args])).args
+            self.args.update(args)
         if type(source) not in [ReadPDF, File, Page, ProcessPDF, FileProcessed, PageProcessed]:
             self.text = TextBlob(str(source))
         elif type(source) in [ReadPDF, ProcessPDF]:
@@ -1074,7 +2844,7 @@ class FrequencyReport:
         elif type(source) in [File, FileProcessed]:
             self.text = self._extractFile(source)
         elif type(source) in [Page, PageProcessed]:
-            self.text = source.text
+            self.text = TextBlob(str(source.text))
         if len(self.text) > 0:
             self.tools = ProcessingTools()
             self.tools._default_word_list_files(
@@ -1082,48 +2852,74 @@ class FrequencyReport:
                 only=os.path.join("options", "ReportOnly.txt")
             )
 
-            self.report_words_raw = self.text.lower().word_counts
-
-            if self.args["report_pos"]:
-                self.report_raw = self.report_POS()
-            else:
-                self.report_raw = self.report_words_raw
-
-            self.report = self.report_raw
-
+            matcher_only = matcher_ignore = None
             if self.args["report_only"] is not None:
-                word_list = self.tools._get_word_list(
+                matcher_only = self.tools._get_matcher(
                     self.args["report_only"], 
                     self.tools.only_file
                 )
-                self.report = self.report_only(word_list)
             if self.args["report_ignore"] is not None:
-                word_list = self.tools._get_word_list(
+                matcher_ignore = self.tools._get_matcher(
                     self.args["report_ignore"], 
-                    self.tools.ignore_file
-                )
-                word_list = self.tools._default_stop_words(
-                    word_list, 
+                    self.tools.ignore_file,
                     self.tools.stop_words_file
                 )
-                self.report = self.report_ignore(word_list)
-
-            self.report_unlimited = self.report
 
-            if self.args["report_limit"]:
-                self.report = self.report_limit(self.report, self.args["report_limit"])
-                self.report_chron = {k:v for k,v in self.report_raw.items() if k in self.report.keys()}
+            # Tags depend on the words around them, so the whole text is tagged
+            # and only then are the tagged words checked against the word lists
+            if self.args["report_pos"]:
+                self.report_raw = collections.Counter({
+                    (word, tag) : count 
+                    for (word, tag), count in self.report_POS().items()
+                    if (matcher_only is None or matcher_only.contains(word))
+                    and (matcher_ignore is None or not matcher_ignore.contains(word))
+                })
+            # Otherwise only the parts of the text that the word lists let through are 
+            # counted, so that phrases in the lists work as they do for the processed text
             else:
-                self.report_chron = self.report
-            self.report_alpha = self._sort_alpha(self.report)
-            self.report_freq = self._sort_freq(self.report)
+                if matcher_only is not None:
+                    self.text = self.tools.words_only(self.text, matcher_only)
+                if matcher_ignore is not None:
+                    self.text = self.tools.words_ignore(self.text, matcher_ignore)
+                self.report_words_raw = self.text.lower().word_counts
+                self.report_raw = self.report_words_raw
 
-            if self.args["report_sort"]:
-                self.report = self.report_freq
-            else:
-                self.report = self.report_alpha
+            self.report = self.report_raw
+            self.report_unlimited = self.report
+            # Counts before the limit, which add up across pages and files
+            self.counts = collections.Counter(self.report)
+            self._finish_report()
         else:
             self.report = {}
+            self.counts = collections.Counter()
+
+    # Limit and sort the counts into the report that is written out
+    def _finish_report(self):
+        self.report = dict(self.counts)
+        if self.args["report_limit"]:
+            self.report = self.report_limit(self.counts, self.args["report_limit"])
+        self.report_chron = {k:v for k,v in self.counts.items() if k in self.report}
+        self.report_alpha = self._sort_alpha(self.report)
+        self.report_freq = self._sort_freq(self.report)
+
+        if self.args["report_sort"]:
+            self.report = self.report_freq
+        else:
+            self.report = self.report_alpha
+
+    # Only the final report is needed once the text has been written
+    def release(self):
+        for attr in [
+            "tools", 
+            "report_words_raw", 
+            "report_raw", 
+            "report_unlimited", 
+            "report_chron", 
+            "report_alpha", 
+            "report_freq"
+        ]:
+            self.__dict__.pop(attr, None)
+        self.text = ""
 
     def _extractFile(self, input_file):
         return TextBlob(" ".join([str(page.text_whole) for page in input_file.pages]))
@@ -1132,12 +2928,16 @@ class FrequencyReport:
         return TextBlob(" ".join([str(self._extractFile(input_file)) for input_file in input_container.files]))
 
     def _sort_alpha(self, report):
+        if len(report) == 0:
+            return dict()
         if type(list(report)[0]) == str:
             return dict(sorted(report.items()))
         elif type(list(report)[0]) == tuple:
             return {pos : report[pos] for pos in sorted(report)}
 
     def _sort_freq(self, report):
+        if len(report) == 0:
+            return dict()
         if type(list(report)[0]) == str:
             return dict(sorted(report.items(), reverse=True, key=lambda x: x[1]))
         elif type(list(report)[0]) == tuple:
@@ -1147,23 +2947,13 @@ class FrequencyReport:
         if type(self.text) != TextBlob:
             self.text = TextBlob(str(self.text))
         self.text = self.text.lower()
-        return {
-            self.text.tags.pop(self.text.tags.index(tag)) : self.text.tags.count(tag) 
-            for tag in self.text.tags
-        }
-    
-    def report_only(self, word_list):
-        if type(list(self.report)[0]) == str:
-            return {k:v for k,v in self.report.items() if k in word_list}
-        elif type(list(self.report)[0]) == tuple:
-            return {k:v for k,v in self.report if k[0] in word_list}
-
-    def report_ignore(self, word_list):
-        if type(list(self.report)[0]) == str:
-            return {k:v for k,v in self.report.items() if k not in word_list}
-        elif type(list(self.report)[0]) == tuple:
-            return {k:v for k,v in self.report.items() if k[0] not in word_list}
+        return self._count_POS(self.text.tags)
 
+    # Count every (word, tag) pair in one pass, in order of first appearance
+    @staticmethod
+    def _count_POS(tags):
+        return collections.Counter(tags)
+    
     def report_limit(self, report, report_limit):
         count = sum(report.values())
 
@@ -1186,9 +2976,11 @@ class FrequencyReport:
             # cutoff after instances have reached cutoff
             report_sorted = self._sort_freq(report)
             report_trimmed = dict()
+            total = 0
             for k,v in report_sorted.items():
-                if sum(report_trimmed.values()) < ceiling:
+                if total < ceiling:
                     report_trimmed[k] = v
+                    total += v
                 else:
                     break 
         # if not a percentile, return top x words 
@@ -1200,35 +2992,65 @@ class FrequencyReport:
 
         else:
             ceiling = int(re.sub(r"[^0-9]", "", limit))
-            report_sorted = self._sort_freq(report)
-            report_trimmed = {k:report[k] for k in list(report_sorted.keys())[0:ceiling]}
+            # Same order as sorting by frequency, ties stay in the order they came
+            report_trimmed = dict(heapq.nlargest(ceiling, report.items(), key=lambda x: x[1]))
         return report_trimmed
 
 class MergedFrequencyReport(FrequencyReport):
 
     def __init__(self, reports, **args):
         self.args = args
-        self.text = ""
         self.report = dict()
-        if len(reports) > 0:
-            
-            self.text = " ".join(
-                [str(report.text) for report in reports]
-            )
-            for report in reports:
-                self.report.update(report.report)
-            
-            self.report_alpha = self._sort_alpha(self.report)
-            self.report_freq = self._sort_freq(self.report)
-            if self.args["report_limit"]:
-                self.report = self.report_limit(self.report, self.args["report_limit"])
-                self.report_chron = {k:v for k,v in self.report.items() if k in self.report.keys()}
-            else:
-                self.report_chron = self.report.copy()
-            if self.args["report_sort"]:
-                self.report = self.report_freq
-            else:
-                self.report = self.report_alpha
+        # Add up the counts from every report before the limit is applied to the total
+        self.counts = collections.Counter()
+        for report in reports:
+            self.counts.update(report.counts)
+        if len(self.counts) > 0:
+            self._finish_report()
+
+class OutputColumns:
+
+    # Every CSV column is filled in by a provider, at the stage where what it needs is 
+    # known: once a page is read, once it has its place in its file, and once it has 
+    # its place in the whole output. Only the columns that will be written are resolved
+    providers = {
+        "page" : {
+            "Page Number (File)" : lambda page: page.page_number + 1,
+            "Word Count" : lambda page: page.word_count,
+            "Text" : lambda page: page.text,
+            "Process Timestamp" : lambda page: time.asctime(),
+            "Raw Text" : lambda page: page.text_whole
+        },
+        "file" : {
+            "Source File Path" : lambda page, f, index: f.path,
+            "Source File Name" : lambda page, f, index: f.filename,
+            "Page Number (Overall)" : lambda page, f, index: index + 1,
+            "Page Processing Duration (s)" : lambda page, f, index: f"{round(page.time,3)}"
+        },
+        "output" : {
+            "Page Number (Overall)" : lambda page, number: number
+        }
+    }
+
+    # Raw Text is only written with the Source Text option, and the tokenize options
+    # fill the Word Count column with the counts of each sentence or word
+    @staticmethod
+    def requested(args):
+        fields = list(args["fields"])
+        if "Raw Text" in fields and not args["source_text"]:
+            fields.remove("Raw Text")
+        if args["tokenize_sentences"] or args["tokenize_words"]:
+            fields = [field for field in fields if field != "Word Count"]
+        return fields
+
+    @classmethod
+    def resolve(cls, stage, args, *sources):
+        requested = cls.requested(args)
+        return {
+            field : provider(*sources) 
+            for field, provider in cls.providers[stage].items() 
+            if field in requested
+        }
 
 class CSVWriter:
     def __init__(self, input_container, user_args="", output_root_path="", output_file_basename=""):
@@ -1251,6 +3073,7 @@ class CSVWriter:
             self.file_basename = self.file_basename[:-1]
 
     
+    @Tracer.traced("write_content")
     def write_content(self):
         if type(self.input_container) in [ReadPDF,ProcessPDF,File,FileProcessed]:
             headers = self._get_content_headers()
@@ -1278,6 +3101,7 @@ class CSVWriter:
                 del line[key]
         return lines
 
+    @Tracer.traced("write_report")
     def write_report(self):
         if type(self.input_container) in [ReadPDF,ProcessPDF,File,FileProcessed]:
             pos = type(list(self.input_container.report.report.items())[0][0]) == tuple
@@ -1324,6 +3148,7 @@ class CSVWriter:
                 type(self.input_container)
             )
 
+    @Tracer.traced("write_corrections")
     def write_corrections(self):
         if type(self.input_container) in [ReadPDF,ProcessPDF,File,FileProcessed]:
             lines = [["Unknown Word","Correction Attempted","Correction","Confidence"]]
@@ -1350,7 +3175,8 @@ class CSVWriter:
             return self.input_container.pages
 
     def _get_content_headers(self):
-        headers = self.args["fields"]
+        # Copy the fields, so that the headers are only adjusted once per output file
+        headers = list(self.args["fields"])
         if "Raw Text" in headers and not self.args["source_text"]:
             headers.remove("Raw Text")
         if self.args["tokenize_sentences"] or self.args["tokenize_words"]:
@@ -1371,22 +3197,20 @@ class CSVWriter:
         return headers
 
     def _build_lines(self):
-        pages = self._flatten_pages()
-        lines = list()
+        return [line for page in self._flatten_pages() for line in self._build_page_lines(page)]
+
+    def _build_page_lines(self, page):
         if not any([self.args["tokenize_sentences"], self.args["tokenize_words"]]):
-            for page in pages:
-                if type(page.output_data["Text"]) == list:
-                    page.detokenize() 
-            lines = [page.output_data for page in pages]
+            if type(page.output_data.get("Text")) == list:
+                page.detokenize() 
+            lines = [page.output_data]
         else:
             expandable_fields = ["Text", "Raw Text"]
             if self.args["tokenize_sentences"]:
-                for page in pages:
-                    page.tokenize_sentences()
+                page.tokenize_sentences()
                 expandable_fields.extend(["Word Count", "Sentence Number"])
             elif self.args["tokenize_words"]:
-                for page in pages:
-                    page.tokenize_words()
+                page.tokenize_words()
                 expandable_fields.extend(["Word Length", "Word Number"])
             lines = [
                 dict(
@@ -1400,12 +3224,58 @@ class CSVWriter:
                         )
                     )
                 )
-                for page in pages
                 for i in range(len(page.output_data["Text"]))
             ]
         
         return lines
 
+    # Write the content CSV one page at a time, see StreamWriter
+    def open_content(self):
+        self.headers = self._get_content_headers()
+        self.content_file = open(f"{self.file_basename}.csv", "w+", newline='')
+        self.content_writer = csv.DictWriter(
+            self.content_file, 
+            fieldnames=self.headers, 
+            dialect='excel'
+        )
+        self.content_writer.writeheader()
+        self.corrections_file = None
+        if self.args["corrections"]:
+            self.corrections_file = open(
+                f"{self.file_basename}-corrections.csv", 
+                "w+", 
+                newline=''
+            )
+            self.corrections_writer = csv.writer(self.corrections_file, dialect='excel')
+            self.corrections_writer.writerow(
+                ["Unknown Word","Correction Attempted","Correction","Confidence"]
+            )
+
+    @Tracer.traced("write_page")
+    def write_page(self, page):
+        self.content_writer.writerows(
+            self._trim_lines(self._build_page_lines(page), self.headers)
+        )
+        if self.corrections_file is not None:
+            self.corrections_writer.writerows(page.corrected_words)
+
+    def close_content(self):
+        self.content_file.close()
+        self.input_container.dialog.file_written(
+            "content",
+            self.input_container.path,
+            f"{self.file_basename}.csv", 
+            type(self.input_container)
+        )
+        if self.corrections_file is not None:
+            self.corrections_file.close()
+            self.input_container.dialog.file_written(
+                "corrections",
+                self.input_container.path,
+                f"{self.file_basename}-corrections.csv", 
+                type(self.input_container)
+            )
+
     def _get_report_headers(self, source_path, pos):
         return [
             [f"Frequency Report for {source_path}"]
@@ -1420,6 +3290,54 @@ class CSVWriter:
         ])
         return lines
 
+class StreamWriter:
+
+    # Writes pages to the content CSV (and corrections CSV) as soon as they are processed
+    # and releases them, so that memory use does not grow with the size of the input
+    def __init__(self, container):
+        self.container = container
+        self.args = container.args
+        self.counter_page = 0
+        self.writer = None
+        # The reports of the files that have been written, added up as they go
+        self.report = MergedFrequencyReport([], **self.args)
+        if not self.args["split"]:
+            self.writer = CSVWriter(container)
+            self.writer.open_content()
+
+    def start_file(self, f):
+        if self.args["split"]:
+            self.writer = CSVWriter(f)
+            self.writer.open_content()
+
+    def write_page(self, page):
+        self.counter_page += 1
+        page.output_data.update(
+            OutputColumns.resolve("output", self.args, page, self.counter_page)
+        )
+        self.writer.write_page(page)
+        page.release()
+
+    def end_file(self, f):
+        if self.args["split"]:
+            self.writer.close_content()
+        f.release()
+        # File reports are only kept when each file has its own report, or its own output
+        if hasattr(f, "report") and not any([self.args["report_file"], self.args["split"]]):
+            self.report.counts.update(f.report.counts)
+            del f.report
+
+    # Files read by worker processes arrive with all their pages already read
+    def write_file(self, f):
+        self.start_file(f)
+        for page in f.pages:
+            self.write_page(page)
+        self.end_file(f)
+
+    def close(self):
+        if not self.args["split"]:
+            self.writer.close_content()
+
 class ProgressOutput:
 
     def __init__(self, container, silent=False):
@@ -1435,6 +3353,7 @@ class ProgressOutput:
         self.percent = 0 
         self.percent_count = 0
         self.counter_files = 0
+        self.counter_pool_pages = 0
         self.leader = "" if self.args["verbose"] else "\r"
         self.rtn = "\n" if self.args["verbose"] else ""
 
@@ -1454,13 +3373,72 @@ class ProgressOutput:
                 "That is an average of {} seconds/file").format(
                     len(self.container.path_list), 
                     "s" if len(self.container.path_list) > 1 else "", 
-                    self.container.word_count,
+                    self.container.word_count_progress,
                     round(self.container.time,3), 
                     round(self.container.time/len(self.container.files)
                     if len(self.container.files) != 0 else 0,3)
                 )
             )
 
+    def ocr_cache_summary(self):
+        if not any([self.silent, self.args["quiet"], self.args["ocr_cache"] is None]):
+            print(
+                ("OCR cache: {} page{} read from the cache (hits), "
+                "{} page{} read with OCR and added to the cache (misses).").format(
+                    self.container.page_count_ocr_cached,
+                    "s" if self.container.page_count_ocr_cached != 1 else "",
+                    self.container.page_count_ocr_read,
+                    "s" if self.container.page_count_ocr_read != 1 else ""
+                )
+            )
+
+    def blank_summary(self):
+        count = self.container.page_count_blank
+        if not any([self.silent, self.args["quiet"], count == 0]):
+            print("{} blank page{} not read with OCR.".format(
+                count,
+                "s were" if count != 1 else " was"
+            ))
+
+    # Shown even in quiet mode, as the Trace option asks for it
+    def trace_summary(self, rows, pages, files, path):
+        if self.silent:
+            return
+        print("Time spent in each stage, where stages inside other stages count towards both:")
+        print("{:<20}{:>8}{:>12}{:>11}{:>11}{:>11}{:>11}".format(
+            "Stage", "Count", "Total (s)", "p50 (ms)", "p90 (ms)", "p99 (ms)", "Max (ms)"
+        ))
+        for row in rows:
+            print("{:<20}{:>8}{:>12.3f}{:>11.2f}{:>11.2f}{:>11.2f}{:>11.2f}".format(
+                row["name"], 
+                row["count"], 
+                row["total"], 
+                row["p50"] * 1000, 
+                row["p90"] * 1000, 
+                row["p99"] * 1000, 
+                row["max"] * 1000
+            ))
+        if len(pages) > 0:
+            print("Slowest pages:")
+            for page_time, filename, page_number in pages:
+                print("{:>10.3f} s  {} page {}".format(page_time, filename, page_number))
+            print("Slowest files:")
+            for file_time, filename in files:
+                print("{:>10.3f} s  {}".format(file_time, filename))
+        print("The trace of every stage was saved to {}".format(path))
+
+    def correction_summary(self):
+        lookups = self.container.correction_hits + self.container.correction_misses
+        if not any([self.silent, self.args["quiet"], lookups == 0]):
+            print(
+                ("Autocorrect: {} of {} word lookups ({}%) were answered from "
+                "words already corrected.").format(
+                    self.container.correction_hits,
+                    lookups,
+                    round(100 * self.container.correction_hits / lookups, 1)
+                )
+            )
+
     def start_file(self):
         self.counter_files += 1
         self.ocr_switch_notice = False
@@ -1491,7 +3469,7 @@ class ProgressOutput:
                     round(self.file.time,3), 
                     self.file.page_count - self.file.page_count_skipped, 
                     "s" if (self.file.page_count - self.file.page_count_skipped) > 1 else "", 
-                    self.file.word_count, 
+                    self.file.word_count_progress, 
                     round(self.file.time/(self.file.page_count-self.file.page_count_skipped)
                     if (self.file.page_count-self.file.page_count_skipped) != 0 
                     else 0,3)
@@ -1506,6 +3484,124 @@ class ProgressOutput:
                         )
                     )
             
+    def files_unchanged(self, count):
+        self.counter_files += count
+        if not any([self.silent, self.args["quiet"], count == 0]):
+            print(
+                "{} file{} unchanged since the last run and will not be read again.".format(
+                    count,
+                    "s were" if count > 1 else " was"
+                )
+            )
+
+    def plan_summary(self, plan):
+        if self.silent:
+            return
+        print("{:<40}{:>8}{:>8}{:>9}{:>8}{:>8}{:>8}".format(
+            "File", "Pages", "Text", "Scanned", "Mixed", "Blank", "OCR"
+        ))
+        for path, kinds, ocr_count in plan.files:
+            if self.container.input_type == "dir":
+                name = os.path.relpath(path, self.container.path)
+            else:
+                name = os.path.basename(path)
+            print("{:<40}{:>8}{:>8}{:>9}{:>8}{:>8}{:>8}".format(
+                name if len(name) <= 38 else "..." + name[-35:],
+                sum(kinds.values()),
+                *[kinds[kind] for kind in PageClassifier.kinds],
+                ocr_count
+            ))
+        print(
+            ("{} page{} in {} file{}, {} of which will be read with OCR. Reading them "
+            "should take about {} seconds with {} worker process{} ({} seconds for each "
+            "OCR page and {} seconds for each text page).").format(
+                plan.page_count,
+                "s" if plan.page_count != 1 else "",
+                len(plan.files),
+                "s" if len(plan.files) != 1 else "",
+                plan.ocr_count,
+                round(plan.time, 1),
+                plan.workers,
+                "es" if plan.workers != 1 else "",
+                round(plan.time_ocr, 3),
+                round(plan.time_text, 4)
+            )
+        )
+
+    def file_invalid(self, path):
+        if not any([self.silent, self.args["quiet"]]):
+            print("{} could not be opened as a PDF file and was skipped.".format(path))
+
+    def files_resumed(self, count):
+        self.counter_files += count
+        if not any([self.silent, self.args["quiet"], count == 0]):
+            print(
+                "{} file{} already read before the last run stopped and will not be read again.".format(
+                    count,
+                    "s were" if count > 1 else " was"
+                )
+            )
+
+    def resume_unused(self, reason):
+        if not self.silent:
+            print("The Resume option has no effect, because {}.".format(reason))
+
+    def stream_unused(self, reason):
+        if not self.silent:
+            print("The Stream option has no effect, because {}.".format(reason))
+
+    def checkpoint_opened(self, path):
+        if not any([self.silent, self.args["quiet"]]):
+            print(
+                "Files are saved to {} as they are read, and the run can be continued "
+                "with the Resume option if it stops.".format(path)
+            )
+
+    def start_pool(self, workers):
+        if not any([self.silent, self.args["quiet"]]):
+            print("Reading files with {} worker processes".format(workers))
+
+    # Pages finish out of order when several files are read at once
+    def pool_page_complete(self, filename, page_number, page_total, word_count, skipped, page_time):
+        self.counter_pool_pages += 1
+        if not any([self.silent, self.args["quiet"]]):
+            if self.args["verbose"]:
+                if not skipped:
+                    print(
+                        "Read and processed {} words from page {}/{} of {} in {} seconds".format(
+                            word_count,
+                            page_number + 1,
+                            page_total,
+                            filename,
+                            round(page_time,3)
+                        )
+                    )
+            else:
+                print(
+                    "\rProgress: {} page{} read, {}/{} files completed        ".format(
+                        self.counter_pool_pages,
+                        "s" if self.counter_pool_pages > 1 else "",
+                        self.counter_files,
+                        len(self.container.path_list)
+                    ),
+                    end="",
+                    flush=True
+                )
+
+    def pool_file_complete(self, file):
+        self.counter_files += 1
+        self.file = file
+        if not self.silent:
+            if self.args["quiet"]:
+                print(
+                    f"\rProcessed file {self.counter_files}/{len(self.container.path_list)}",
+                    end="" if self.counter_files < len(self.container.path_list) else "\n",
+                    flush=True
+                )
+            else:
+                print(self.leader, end="")
+                self.end_file()
+
     def page_complete(self):
         if not any([self.silent, self.args["quiet"]]):
             if all([
@@ -1515,7 +3611,7 @@ class ProgressOutput:
                 print(
                         "{}Read and processed {} words from page {}/{} in {} seconds        ".format(
                             self.leader,
-                            self.page.word_count, 
+                            self.page.word_count_progress, 
                             self.page.page_number + 1, 
                             len(self.file.pdf), 
                             round(self.page.time,3)
@@ -1537,7 +3633,7 @@ class ProgressOutput:
         if all([self.args["verbose"], not self.page.skipped]):
             print(
                 "Read {} words from page {}/{} in {} seconds".format(
-                    self.page.word_count,
+                    self.page.word_count_progress,
                     self.page.page_number + 1,
                     len(self.file.pdf),
                     round(self.page.time,3)
@@ -1598,7 +3694,8 @@ class ProgressOutput:
             )
 
     def complete(self):
-        if not self.silent:
+        # A plan reads and writes nothing
+        if not any([self.silent, self.args["plan"]]):
             print(
                 ("All input files have been read "
                 "and all output files have been written in {} seconds.").format(
@@ -1606,6 +3703,55 @@ class ProgressOutput:
                 )
             )
 
+class ProgressRelay:
+
+    # Stands in for ProgressOutput in worker processes and sends each finished page
+    # back to the main process, where it is reported by ProgressOutput.pool_page_complete
+    def __init__(self, events):
+        self.events = events
+        self.file = None
+        self.page = None
+        self.filename = ""
+        self.page_total = 0
+
+    def _send_page(self):
+        if self.events is not None:
+            self.events.put((
+                self.filename,
+                self.page.page_number,
+                self.page_total,
+                self.page.word_count_progress,
+                self.page.skipped,
+                self.page.time
+            ))
+
+    def start_file(self):
+        self.start_range(self.file.path, len(self.file.pdf))
+
+    def start_range(self, path, page_total):
+        self.filename = os.path.basename(path)
+        self.page_total = page_total
+
+    def end_file(self):
+        pass
+
+    def page_read(self):
+        # Processed pages are sent once processing is complete
+        if not isinstance(self.page, PageProcessed):
+            self._send_page()
+
+    def page_process(self):
+        pass
+
+    def page_complete(self):
+        self._send_page()
+
+    def page_skip(self):
+        pass
+
+    def ocr_switch(self):
+        pass
+
 def main():
     processed = ProcessPDF()
     processed.write()
@@ -38,7 +38,8 @@ setuptools.setup(
     python_requires='>=3.6',
     entry_points={
         "console_scripts": [
-            "datasets-from-pdfs = datasets_from_pdfs.readpdf:main"
+            "datasets-from-pdfs = datasets_from_pdfs.readpdf:main",
+            "datasets-from-pdfs-benchmark = datasets_from_pdfs.benchmark:main"
         ]
     },
 )
@@ -0,0 +1,53 @@
+import os
+import fitz
+import pytest
+
+from datasets_from_pdfs.readpdf import ReadPDF
+
+# The package uses the camelCase names of PyMuPDF, which newer versions only
+# provide once the aliases are restored
+if hasattr(fitz, "restore_aliases"):
+    fitz.restore_aliases()
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "datasets_from_pdfs")
+
+SENTENCES = [
+    "The quick brown fox jumps over the lazy dog.",
+    "A journey of a thousand miles begins with a single step.",
+    "All that glitters is not gold, and not all who wander are lost.",
+    "Numbers like 42 and 1999 appear in the text as well.",
+]
+
+
+# The options folder is found relative to the working directory
+@pytest.fixture(autouse=True)
+def package_dir(monkeypatch):
+    monkeypatch.chdir(PACKAGE_DIR)
+    return PACKAGE_DIR
+
+
+# Every page in these corpora has a text layer, so Tesseract is never run
+@pytest.fixture
+def no_tesseract(monkeypatch):
+    monkeypatch.setattr(ReadPDF, "find_tesseract", lambda self: None)
+
+
+def make_text_pdf(path, pages):
+    pdf = fitz.open()
+    for i in range(pages):
+        page = pdf.newPage()
+        text = " ".join(SENTENCES[(i + j) % len(SENTENCES)] for j in range(3))
+        page.insertTextbox(fitz.Rect(72, 72, 540, 720), text, fontsize=11)
+    pdf.save(str(path))
+    pdf.close()
+    return str(path)
+
+
+@pytest.fixture
+def text_corpus(tmp_path):
+    corpus = tmp_path / "corpus"
+    (corpus / "sub").mkdir(parents=True)
+    make_text_pdf(corpus / "one.pdf", 2)
+    make_text_pdf(corpus / "two.pdf", 3)
+    make_text_pdf(corpus / "sub" / "three.pdf", 1)
+    return corpus
@@ -0,0 +1,71 @@
+import json
+
+import fitz
+
+from datasets_from_pdfs.benchmark import Benchmark, SyntheticCorpus
+from datasets_from_pdfs.readpdf import OCREngine, PageClassifier, ReadPDF
+
+
+def test_corpus_pages_of_each_kind(tmp_path):
+    corpus = SyntheticCorpus(str(tmp_path))
+    for make, kind in [
+        (corpus.text_pdf, "text"),
+        (corpus.scan_pdf, "scanned"),
+        (corpus.mixed_pdf, "mixed"),
+    ]:
+        with fitz.open(make("{}.pdf".format(kind), 2)) as pdf:
+            assert [PageClassifier.classify(page) for page in pdf] == [kind, kind]
+
+
+def test_corpus_same_every_run(tmp_path):
+    texts = list()
+    for name in ["first", "second"]:
+        (tmp_path / name).mkdir()
+        with fitz.open(SyntheticCorpus(str(tmp_path / name)).text_pdf("text.pdf", 3)) as pdf:
+            texts.append([page.getText() for page in pdf])
+    assert texts[0] == texts[1]
+
+
+def test_corpus_folder_discovered(tmp_path, no_tesseract):
+    folder = SyntheticCorpus(str(tmp_path)).folder("discovery", 25)
+    reader = ReadPDF.__new__(ReadPDF)
+    reader.args = {"discovery_threads": 1}
+    reader.input_type = "dir"
+    assert len(reader.get_file_list(folder)) == 25
+
+
+def test_suite_saves_timings(tmp_path, no_tesseract, monkeypatch):
+    monkeypatch.setattr(OCREngine, "recognise", lambda self, image_data, dpi: "text\f")
+    output = str(tmp_path / "timings.json")
+    Benchmark([
+        "suite", "-p", "2", "-s", "1", "3", "-f", "5", "-r", "1",
+        "-d", str(tmp_path / "corpus"), "-o", output
+    ]).run()
+    with open(output) as results_file:
+        results = json.load(results_file)
+    assert results["options"]["sizes"] == [1, 3]
+    assert {"read_page.size-1", "read_page.size-3", "ocr_page.scan", "csv_writer"} <= set(results["stages"])
+    assert results["stages"]["csv_writer"]["items"] == 3
+
+
+def test_compare_marks_slower_stages(tmp_path, capsys):
+    earlier = str(tmp_path / "earlier.json")
+    with open(earlier, "w") as results_file:
+        json.dump({"stages": {
+            "same": {"ms/item": 1.0},
+            "slower": {"ms/item": 1.0},
+            "faster": {"ms/item": 1.0},
+            "skipped": {"skipped": "missing corpus"},
+        }}, results_file)
+    benchmark = Benchmark(["suite", "-c", earlier, "-t", "0.2"])
+    benchmark._compare({"stages": {
+        "same": {"ms/item": 1.1},
+        "slower": {"ms/item": 1.5},
+        "faster": {"ms/item": 0.5},
+        "skipped": {"ms/item": 1.0},
+        "new": {"ms/item": 1.0},
+    }})
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split()[0] for line in lines if line.endswith(" slower")] == ["slower"]
+    assert not any(line.startswith(("skipped", "new")) for line in lines)
+    assert lines[-1] == "1 stage was slower than the earlier run by more than 20%."
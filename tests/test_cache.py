@@ -0,0 +1,58 @@
+import time
+
+from datasets_from_pdfs.readpdf import SQLiteCache
+
+
+def test_cache_counts_hits_and_misses(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), "ocr", 1024)
+    assert cache.get("page") is None
+    cache.put("page", "text")
+    assert cache.get("page") == "text"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_kept_between_runs(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path, "ocr", 1024)
+    cache.put("page", "text")
+    cache.flush()
+    cache = SQLiteCache(path, "ocr", 1024)
+    assert cache.get("page") == "text"
+    assert cache.size == len("text")
+    assert SQLiteCache(path, "corrections", 1024).get("page") is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), "ocr", 100)
+    for key in ["a", "b", "c"]:
+        cache.put(key, "x" * 30)
+        time.sleep(0.01)
+    # Using the oldest value keeps it over the one added after it
+    cache.get("a")
+    cache.put("d", "x" * 30)
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in ["a", "c", "d"]] == [True, True, True]
+    assert cache.size <= 90
+
+
+def test_cache_opened_once_per_process(tmp_path):
+    path = str(tmp_path / "cache.db")
+    assert SQLiteCache.open(path, "ocr", 1024) is SQLiteCache.open(path, "ocr", 1024)
+    assert SQLiteCache.open(path, "ocr", 1024) is not SQLiteCache.open(path, "corrections", 1024)
+
+
+def test_cache_written_once_per_flush(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path, "ocr", 1024)
+    cache.put("old", "text")
+    cache.flush()
+    changes = cache.connection.total_changes
+    for key in ["a", "b", "c"]:
+        cache.put(key, "text")
+    assert cache.get("a") == "text"
+    assert cache.get("old") == "text"
+    assert cache.connection.total_changes == changes
+    assert SQLiteCache(path, "ocr", 1024).get("a") is None
+    cache.flush()
+    assert cache.connection.total_changes == changes + 4
+    assert SQLiteCache(path, "ocr", 1024).get("a") == "text"
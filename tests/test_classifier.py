@@ -0,0 +1,86 @@
+import os
+
+import fitz
+import pytest
+
+from datasets_from_pdfs.readpdf import Arguments, OCREngine, PageClassifier, ProcessPDF, ReadPDF
+
+
+def scan(text="Hello scanned world"):
+    source = fitz.open()
+    page = source.newPage()
+    page.insertText((72, 100), text, fontsize=20)
+    return page.getPixmap(matrix=fitz.Matrix(2, 2), colorspace=fitz.csGRAY)
+
+
+# One page of each kind, in the order of PageClassifier.kinds
+@pytest.fixture
+def kinds_pdf(tmp_path):
+    pdf = fitz.open()
+    page = pdf.newPage()
+    page.insertText((72, 100), "A page with a text layer", fontsize=11)
+    page = pdf.newPage()
+    page.insertImage(page.rect, pixmap=scan())
+    page = pdf.newPage()
+    page.insertText((72, 100), "A page with text and a figure", fontsize=11)
+    page.insertImage(fitz.Rect(72, 200, 472, 600), pixmap=scan("A figure"))
+    pdf.newPage()
+    path = str(tmp_path / "kinds.pdf")
+    pdf.save(path)
+    return path
+
+
+def args(options=""):
+    return Arguments('"DEFAULT" {}'.format(options)).args
+
+
+def test_pages_classified_by_kind(kinds_pdf):
+    with fitz.open(kinds_pdf) as pdf:
+        assert [PageClassifier.classify(page) for page in pdf] == PageClassifier.kinds
+
+
+@pytest.mark.parametrize("options, ocr", [
+    ("", [False, True, False, False]),
+    ("-hy", [False, True, True, False]),
+    ("-t", [True, True, True, False]),
+    ("-a", [False, False, False, False]),
+])
+def test_needs_ocr_follows_mode(options, ocr):
+    assert [PageClassifier.needs_ocr(kind, args(options)) for kind in PageClassifier.kinds] == ocr
+
+
+def test_plan_counts_pages_without_reading(kinds_pdf, no_tesseract, monkeypatch):
+    monkeypatch.setattr(OCREngine, "recognise", lambda self, image_data, dpi: "")
+    monkeypatch.setattr(ReadPDF, "_read_files", lambda self: pytest.fail("Files were read"))
+    plan = ReadPDF('"{}" -q -pl'.format(kinds_pdf)).plan
+    assert (plan.page_count, plan.ocr_count, plan.text_count) == (4, 1, 2)
+    path, kinds, ocr_count = plan.files[0]
+    assert all(kinds[kind] == 1 for kind in PageClassifier.kinds)
+
+
+def test_plan_writes_nothing(kinds_pdf, no_tesseract, monkeypatch, capsys):
+    monkeypatch.setattr(OCREngine, "recognise", lambda self, image_data, dpi: "")
+    # As in main, which writes the outputs of every run
+    processed = ProcessPDF('"{}" -pl'.format(kinds_pdf))
+    processed.write()
+    processed.dialog.complete()
+    assert "all output files have been written" not in capsys.readouterr().out
+    assert not os.path.exists(os.path.splitext(kinds_pdf)[0] + ".csv")
+
+
+def test_hybrid_reads_only_uncovered_images(kinds_pdf, no_tesseract, monkeypatch):
+    calls = list()
+
+    def recognise(self, image_data, dpi):
+        calls.append(dpi)
+        return "Figure text\f"
+    monkeypatch.setattr(OCREngine, "recognise", recognise)
+    pages = ReadPDF('"{}" -q -hy -f t'.format(kinds_pdf)).files[0].pages
+    assert [page.method for page in pages] == ["text", "ocr", "hybrid", "blank"]
+    assert "A page with text and a figure" in pages[2].text
+    assert "Figure text" in pages[2].text
+    assert "Figure text" not in pages[0].text
+    assert len(calls) == 2
+    pages = ReadPDF('"{}" -q -f t'.format(kinds_pdf)).files[0].pages
+    assert [page.method for page in pages] == ["text", "ocr", "text", "blank"]
+    assert "Figure text" not in pages[2].text
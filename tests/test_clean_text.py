@@ -0,0 +1,63 @@
+import random
+import re
+
+import pytest
+import unidecode
+
+from datasets_from_pdfs.readpdf import TextNormalizer
+
+
+# Page.clean_text as it was before its passes were compiled into TextNormalizer
+def clean_text_old(text_raw):
+    text_clean = re.sub(r"\s", " ", text_raw)
+    text_clean = unidecode.unidecode(text_clean)
+    text_clean = re.sub(r"[\u2018\u2019\u201a\u201b\u2032`']", r"'", text_clean)
+    text_clean = re.sub(r"\S-\s+", lambda x: x.group(0)[0], text_clean)
+    text_clean = re.sub(r'''[^a-zA-Z0-9' .;,"$/@!?&\-()_]''', r"", text_clean)
+    text_clean = re.sub(r"(\b\w\s)+", strip_whitespace_old, text_clean)
+    text_clean = re.sub(r"\s+", " ", text_clean)
+    text_clean = re.sub(r"\s[.,;]", lambda x: x.group(0)[1], text_clean)
+    text_clean = re.sub(r"(?i)\bt\s?h\s?e\b", lambda x: x.group(0)[0] + "he", text_clean)
+    text_clean = re.sub(r"\ba\s?n\s?d\b", lambda x: x.group(0)[0] + "nd", text_clean)
+    return text_clean.strip()
+
+
+def strip_whitespace_old(text):
+    return "".join(c for c in text.group(0) if not re.match(r"\s", c)) + " "
+
+
+EDGE_CASES = [
+    "",
+    " ",
+    "\n\t\r\f\v",
+    "no\xa0break\xa0spaces",
+    "em\u2003space and\u3000ideographic\u205fspace",
+    "line\u2028separator\u2029paragraph\x85next line",
+    "file\x1cgroup\x1drecord\x1eunit\x1fseparators",
+    "hyphen-\nated line-  \n  break",
+    "hyphen-\xa0nbsp and dash - alone",
+    "- leading hyphen and trailing-",
+    "T h e  q u i c k fox",
+    "t he and a n d THE AND tHe",
+    "curly \u2018quotes\u2019 and \u201alow\u201b and prime\u2032 and `back`",
+    "caf\xe9 na\xefve stra\xdfe \u4e2d\u6587",
+    "spaces before , punctuation ; and .",
+    "symbols #*%^~ <tags> [brackets] {braces} |pipes|",
+    "$5.00 @home 50% off! (really?) a_b",
+]
+
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_normalizer_matches_old_clean_text(text):
+    assert TextNormalizer.normalize(text) == clean_text_old(text)
+
+
+def test_normalizer_matches_old_clean_text_on_random_strings():
+    alphabet = list("aAndtThHeE xyz09-_.,;'`\"$*#") + [
+        "  ", "\t", "\n", "\x1c", "\xa0", "\u2019", "\u201a", "\xe9", "\xdf", 
+        "\u2003", "\u4e2d", "t h e", "T H e", "The", "a n d", "And", "- \n"
+    ]
+    generator = random.Random(0)
+    for _ in range(5000):
+        text = "".join(generator.choices(alphabet, k=generator.randint(1, 30)))
+        assert TextNormalizer.normalize(text) == clean_text_old(text), repr(text)
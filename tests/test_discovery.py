@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from datasets_from_pdfs.readpdf import ReadPDF
+from conftest import make_text_pdf
+
+
+@pytest.fixture
+def mixed_folder(tmp_path):
+    folder = tmp_path / "folder"
+    (folder / "sub" / "deeper").mkdir(parents=True)
+    make_text_pdf(folder / "file10.pdf", 1)
+    make_text_pdf(folder / "file2.pdf", 1)
+    make_text_pdf(folder / "UPPER.PDF", 1)
+    make_text_pdf(folder / "sub" / "deeper" / "nested.pdf", 1)
+    make_text_pdf(folder / ".hidden.pdf", 1)
+    (folder / "notes.txt").write_text("Not a PDF")
+    (folder / "sub" / "renamed.pdf").write_bytes(b"Just some text with a PDF extension")
+    # Passes for a PDF by its header, but can not be opened
+    (folder / "broken.pdf").write_bytes(b"%PDF-1.4\nnothing else")
+    return folder
+
+
+def relative(folder, paths):
+    return [os.path.relpath(path, str(folder)) for path in paths]
+
+
+@pytest.mark.parametrize("options", ["", "-dt 4"])
+def test_discovery_finds_pdf_files_in_order(mixed_folder, no_tesseract, options):
+    reader = ReadPDF('"{}" -q {}'.format(mixed_folder, options))
+    assert relative(mixed_folder, reader.get_file_list(str(mixed_folder))) == [
+        "UPPER.PDF",
+        "broken.pdf",
+        "file2.pdf",
+        "file10.pdf",
+        os.path.join("sub", "deeper", "nested.pdf"),
+    ]
+
+
+def test_unreadable_files_left_out(mixed_folder, no_tesseract, capsys):
+    reader = ReadPDF('"{}"'.format(mixed_folder))
+    assert "broken.pdf" not in relative(mixed_folder, reader.path_list)
+    assert len(reader.files) == 4
+    assert "broken.pdf could not be opened as a PDF file" in capsys.readouterr().out
@@ -0,0 +1,102 @@
+import csv
+import os
+
+from datasets_from_pdfs.readpdf import ReadPDF, ProcessPDF, Manifest
+
+
+def run(corpus, options):
+    processed = ProcessPDF('"{}" -q {}'.format(corpus, options))
+    processed.write()
+    return processed
+
+
+def read_rows(corpus):
+    with open("{}.csv".format(corpus), newline="") as output_file:
+        return list(csv.DictReader(output_file))
+
+
+def test_manifest_round_trip_keeps_pages(text_corpus, no_tesseract):
+    first = run(text_corpus, "-in")
+    rows_first = read_rows(text_corpus)
+    second = run(text_corpus, "-in")
+    assert all(f.from_manifest for f in second.files)
+    assert len(second.files_read) == 0
+    assert read_rows(text_corpus) == rows_first
+    assert len(first.files) == 3
+
+
+def test_manifest_not_reused_for_other_columns(text_corpus, no_tesseract):
+    run(text_corpus, "-in -f pn")
+    second = run(text_corpus, "-in")
+    assert not any(f.from_manifest for f in second.files)
+    rows = read_rows(text_corpus)
+    assert len(rows) == 6
+    for row in rows:
+        assert row["Page Number (File)"] != ""
+        assert row["Word Count"] != ""
+        assert row["Text"] != ""
+
+
+def test_manifest_drops_changed_and_removed_files(text_corpus, no_tesseract):
+    run(text_corpus, "-in")
+    os.remove(text_corpus / "two.pdf")
+    with open(text_corpus / "one.pdf", "ab") as pdf_file:
+        pdf_file.write(b"\n% changed\n")
+    second = run(text_corpus, "-in")
+    assert [f.filename for f in second.files] == ["one.pdf", "three.pdf"]
+    assert [f.from_manifest for f in second.files] == [False, True]
+
+
+def test_manifest_load_checks_options(text_corpus, no_tesseract):
+    processed = run(text_corpus, "")
+    path = str(text_corpus.parent / "test-manifest.db")
+    manifest = Manifest(path, "options")
+    manifest.save(processed.files)
+    assert set(manifest.load(processed.path_list)) == set(processed.path_list)
+    other = Manifest(path, "other options")
+    assert other.load(processed.path_list) == dict()
+    other.remove()
+    assert not os.path.exists(path)
+
+
+def test_checkpoint_removed_after_write(text_corpus, no_tesseract):
+    run(text_corpus, "-re")
+    assert not os.path.exists("{}-checkpoint.db".format(text_corpus))
+
+
+def test_checkpoint_only_kept_with_resume(text_corpus, no_tesseract):
+    # A run that is not written stands in for one that was stopped
+    ProcessPDF('"{}" -q'.format(text_corpus))
+    assert not os.path.exists("{}-checkpoint.db".format(text_corpus))
+    stopped = ProcessPDF('"{}" -q -re'.format(text_corpus))
+    assert os.path.exists(stopped.manifest.path)
+    stopped.manifest.connection.close()
+    resumed = run(text_corpus, "-re")
+    assert all(f.from_manifest for f in resumed.files)
+    assert len(read_rows(text_corpus)) == 6
+    assert not os.path.exists("{}-checkpoint.db".format(text_corpus))
+
+
+def test_resume_reports_checkpoint(text_corpus, no_tesseract, capsys):
+    ProcessPDF('"{}" -re'.format(text_corpus)).write()
+    assert "{}-checkpoint.db".format(text_corpus) in capsys.readouterr().out
+
+
+def test_resume_warns_when_unused(text_corpus, no_tesseract, capsys):
+    for container, path, options in [
+        (ReadPDF, text_corpus, ""),
+        (ProcessPDF, text_corpus / "one.pdf", ""),
+        (ProcessPDF, text_corpus, "-sw"),
+    ]:
+        processed = container('"{}" -q -re {}'.format(path, options))
+        assert processed.manifest is None
+        assert "The Resume option has no effect" in capsys.readouterr().out
+
+
+def test_stream_warns_when_incremental(text_corpus, no_tesseract, capsys):
+    processed = ProcessPDF('"{}" -q -in -sw'.format(text_corpus))
+    assert processed.stream is None
+    assert "The Stream option has no effect" in capsys.readouterr().out
+    processed = ProcessPDF('"{}" -q -sw'.format(text_corpus))
+    assert processed.stream is not None
+    assert "The Stream option has no effect" not in capsys.readouterr().out
@@ -0,0 +1,215 @@
+import hashlib
+import io
+
+import fitz
+import pytest
+from PIL import Image, ImageSequence
+
+from datasets_from_pdfs.readpdf import Arguments, OCREngine, ReadPDF
+
+
+def scan(dpi):
+    source = fitz.open()
+    page = source.newPage()
+    page.insertText((72, 100), "Hello scanned world", fontsize=20)
+    return page.getPixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), colorspace=fitz.csGRAY)
+
+
+# Whole-page scans at two resolutions, which are extracted at their own resolution
+@pytest.fixture
+def mixed_scans(tmp_path):
+    pdf = fitz.open()
+    for dpi in [150, 300, 150, 300]:
+        page = pdf.newPage()
+        page.insertImage(page.rect, pixmap=scan(dpi))
+    path = str(tmp_path / "scans.pdf")
+    pdf.save(path)
+    return fitz.open(path)
+
+
+def unchecked(self, page):
+    raise AssertionError("A page found in the cache was checked for ink")
+
+
+def engine(options=""):
+    return OCREngine(**Arguments('"DEFAULT" {}'.format(options)).args)
+
+
+# Answers each frame of an image with its number and resolution, instead of running Tesseract
+class FakeTesseract:
+
+    def __init__(self):
+        self.calls = list()
+
+    def __call__(self, image_data, dpi):
+        frames = list(ImageSequence.Iterator(Image.open(io.BytesIO(image_data))))
+        self.calls.append((dpi, len(frames)))
+        return "".join("{} {}\f".format(dpi, frame.info.get("dpi")) for frame in frames)
+
+
+def test_batch_sends_one_image_per_resolution(mixed_scans):
+    ocr = engine("-ob 4")
+    tesseract = FakeTesseract()
+    ocr.recognise = tesseract
+    ocr.read_batch(list(mixed_scans))
+    assert sorted(tesseract.calls) == [(150, 2), (300, 2)]
+    texts = [ocr.batch_ocr[i][0] for i in range(len(mixed_scans))]
+    assert [text.split()[0] for text in texts] == ["150", "300", "150", "300"]
+
+
+def test_batch_falls_back_when_pages_are_missing(mixed_scans):
+    ocr = engine("-ob 4")
+    ocr.recognise = lambda image_data, dpi: "only one page\f"
+    ocr.read_batch(list(mixed_scans))
+    assert ocr.batch_ocr == dict()
+
+
+def test_cached_page_not_checked_for_ink(mixed_scans, tmp_path, no_tesseract, monkeypatch):
+    options = '"{}" -q -sb -oc "{}"'.format(mixed_scans.name, tmp_path / "ocr.db")
+    monkeypatch.setattr(OCREngine, "recognise", lambda self, image_data, dpi: "read once\f")
+    first = ReadPDF(options)
+    assert not first.files[0].pages[0].ocr_cached
+    monkeypatch.setattr(OCREngine, "looks_blank", unchecked)
+    second = ReadPDF(options)
+    assert all(page.ocr_cached for page in second.files[0].pages)
+    assert [page.text for page in second.files[0].pages] == [page.text for page in first.files[0].pages]
+
+
+def test_batch_fallback_counts_each_miss_once(mixed_scans, tmp_path):
+    ocr = engine('-ob 4 -oc "{}"'.format(tmp_path / "ocr.db"))
+    ocr.recognise = lambda image_data, dpi: "only one page\f"
+    ocr.read_batch(list(mixed_scans))
+    texts = [ocr.read(page) for page in mixed_scans]
+    assert texts == ["only one page\f"] * len(mixed_scans)
+    assert (ocr.cache.hits, ocr.cache.misses) == (0, len(mixed_scans))
+    assert ocr.batch_keys == dict()
+
+
+# A white scan with a few specks of dust, and a scan with a line of text on it
+@pytest.fixture
+def blank_scans(tmp_path):
+    pdf = fitz.open()
+    page = pdf.newPage()
+    source = fitz.open()
+    empty = source.newPage()
+    for x in range(100, 500, 100):
+        empty.drawCircle((x, 400), 1, color=(0, 0, 0), fill=(0, 0, 0))
+    page.insertImage(page.rect, pixmap=empty.getPixmap(colorspace=fitz.csGRAY))
+    page = pdf.newPage()
+    page.insertImage(page.rect, pixmap=scan(150))
+    path = str(tmp_path / "blank.pdf")
+    pdf.save(path)
+    return path
+
+
+def test_blank_scans_skipped(blank_scans, no_tesseract, monkeypatch):
+    tesseract = FakeTesseract()
+    monkeypatch.setattr(OCREngine, "recognise", lambda self, image_data, dpi: tesseract(image_data, dpi))
+    pages = ReadPDF('"{}" -q -sb'.format(blank_scans)).files[0].pages
+    assert [page.method for page in pages] == ["blank", "ocr"]
+    assert len(tesseract.calls) == 1
+    pages = ReadPDF('"{}" -q'.format(blank_scans)).files[0].pages
+    assert [page.method for page in pages] == ["ocr", "ocr"]
+    assert len(tesseract.calls) == 3
+
+
+def test_ink_share_of_scans(blank_scans):
+    ocr = engine("-sb")
+    with fitz.open(blank_scans) as pdf:
+        shares = [ocr.ink_share(ocr.page_image(page)) for page in pdf]
+    assert shares[0] * 100 < ocr.blank_threshold < shares[1] * 100
+
+
+def test_resolution_policy(mixed_scans):
+    page = mixed_scans[0]
+    assert engine().zoom_for(page) == OCREngine.zoom
+    # Never finer than the 150 dpi scan, which is shown at its own resolution
+    assert engine("-od 300").zoom_for(page) == pytest.approx(150 / 72, rel=0.01)
+    assert engine("-od 100").zoom_for(page) == pytest.approx(100 / 72)
+    pdf = fitz.open()
+    text_page = pdf.newPage()
+    assert engine("-od 300").zoom_for(text_page) == pytest.approx(300 / 72)
+    huge = pdf.newPage(width=14400, height=14400)
+    zoom = engine("-od 300").zoom_for(huge)
+    assert abs(huge.rect) * zoom * zoom == pytest.approx(OCREngine.pixel_limit)
+
+
+def test_resolution_not_lowered_by_small_images():
+    source = scan(72)
+    pdf = fitz.open()
+    # A small logo at a low resolution on a page of text
+    page = pdf.newPage()
+    page.insertText((72, 300), "A page with a text layer", fontsize=11)
+    page.insertImage(fitz.Rect(72, 72, 144, 144), pixmap=source)
+    assert engine("-od 300").zoom_for(page) == pytest.approx(300 / 72)
+    # A coarse scan of the whole page is still rendered finely enough to read
+    page = pdf.newPage()
+    page.insertImage(page.rect, pixmap=source)
+    assert engine("-od 300").zoom_for(page) == pytest.approx(OCREngine.dpi_min / 72)
+    assert engine("-od 100").zoom_for(page) == pytest.approx(100 / 72)
+
+
+def test_scan_extracted_at_its_own_resolution(mixed_scans):
+    pix = engine().page_image(mixed_scans[1])
+    assert (pix.xres, pix.n) == (300, 1)
+    # The pixels of the scan itself, not a new rendering of the page
+    source = scan(300)
+    assert (pix.width, pix.height) == (source.width, source.height)
+    assert engine().scan_image(mixed_scans[1]) is not None
+    # Rendered as before with the render source, or once the page is turned
+    assert engine("-os render").scan_image(mixed_scans[1]) is None
+    mixed_scans[1].setRotation(90)
+    assert engine().scan_image(mixed_scans[1]) is None
+
+
+def test_scan_with_text_beside_it_rendered(tmp_path):
+    pdf = fitz.open()
+    page = pdf.newPage()
+    page.insertImage(fitz.Rect(72, 72, 300, 300), pixmap=scan(150))
+    assert engine().scan_image(page) is None
+    assert engine().page_image(page).width == round(page.rect.width * OCREngine.zoom)
+
+
+# Answers each frame of an image with a digest of its pixels, so that the text
+# shows whether two routes handed Tesseract the same image
+def pixel_tesseract(calls):
+    def recognise(self, image_data, dpi):
+        frames = list(ImageSequence.Iterator(Image.open(io.BytesIO(image_data))))
+        calls.append(len(frames))
+        return "".join(
+            "{} {}\f".format(hashlib.sha256(frame.convert("L").tobytes()).hexdigest(), dpi)
+            for frame in frames
+        )
+    return recognise
+
+
+def test_memory_route_sends_the_page_image(mixed_scans, monkeypatch):
+    images = list()
+
+    def recognise_file(self, img):
+        with Image.open(img) as image:
+            images.append((image.convert("L").tobytes(), round(image.info["dpi"][0])))
+        return ""
+
+    def recognise(self, image_data, dpi):
+        images.append((Image.open(io.BytesIO(image_data)).convert("L").tobytes(), dpi))
+        return ""
+    monkeypatch.setattr(OCREngine, "recognise_file", recognise_file)
+    monkeypatch.setattr(OCREngine, "recognise", recognise)
+    for page in mixed_scans:
+        engine("-oi file").read(page)
+        engine("-oi memory").read(page)
+    assert len(images) == 2 * len(mixed_scans)
+    assert images[0::2] == images[1::2]
+    assert [dpi for image, dpi in images[0::2]] == [150, 300, 150, 300]
+
+
+def test_batches_read_like_single_pages(mixed_scans, no_tesseract, monkeypatch):
+    calls = list()
+    monkeypatch.setattr(OCREngine, "recognise", pixel_tesseract(calls))
+    single = [page.text for page in ReadPDF('"{}" -q'.format(mixed_scans.name)).files[0].pages]
+    assert calls == [1] * len(mixed_scans)
+    calls.clear()
+    batched = [page.text for page in ReadPDF('"{}" -q -ob 3'.format(mixed_scans.name)).files[0].pages]
+    assert batched == single
+    assert len(calls) < len(mixed_scans)
@@ -0,0 +1,67 @@
+import csv
+
+import pytest
+
+from datasets_from_pdfs.readpdf import ProcessPDF, PageClassifier
+from conftest import make_text_pdf
+
+
+@pytest.fixture
+def sized_corpus(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    make_text_pdf(corpus / "a.pdf", 1)
+    make_text_pdf(corpus / "b.pdf", 9)
+    make_text_pdf(corpus / "c.pdf", 3)
+    return corpus
+
+
+def unclassified(page):
+    raise AssertionError("Pages are classified before the pool starts")
+
+
+def test_pool_tasks_largest_first(sized_corpus, no_tesseract, monkeypatch):
+    monkeypatch.setattr(PageClassifier, "classify", unclassified)
+    processed = ProcessPDF('"{}" -q -w 2 -wc 4'.format(sized_corpus))
+    tasks = processed._get_pool_tasks(processed.path_list)
+    assert [(i, start, stop) for i, path, start, stop in tasks[:2]] == [(1, 0, 4), (1, 4, 8)]
+    assert (1, 8, 9) in [(i, start, stop) for i, path, start, stop in tasks]
+    assert [i for i, path, start, stop in tasks if start is None] == [2, 0]
+    assert [f.page_count for f in processed.files] == [1, 9, 3]
+
+
+def test_pool_tasks_weigh_chosen_pages(sized_corpus, no_tesseract):
+    processed = ProcessPDF('"{}" -q -w 2 -wc 4'.format(sized_corpus))
+    # Only the last page of the largest file, as with the option "-p 9"
+    processed.args["pages"] = [8]
+    tasks = processed._get_pool_tasks(processed.path_list)
+    chunks = [start for i, path, start, stop in tasks if start is not None]
+    assert chunks == [8, 0, 4]
+
+
+
+def read_rows(corpus):
+    with open("{}.csv".format(corpus), newline="") as output_file:
+        return list(csv.DictReader(output_file))
+
+
+@pytest.mark.parametrize("options", ["-w 2", "-w 3 -wc 2", "-w 2 -wc 4"])
+def test_pool_output_matches_serial(sized_corpus, no_tesseract, options):
+    serial = ProcessPDF('"{}" -q -f nfowt -r'.format(sized_corpus))
+    serial.write()
+    rows = read_rows(sized_corpus)
+    parallel = ProcessPDF('"{}" -q -f nfowt -r {}'.format(sized_corpus, options))
+    parallel.write()
+    assert read_rows(sized_corpus) == rows
+    assert len(rows) == 13
+    assert parallel.report.report == serial.report.report
+
+
+def test_pool_leaves_out_unreadable_files(sized_corpus, no_tesseract, capsys):
+    (sized_corpus / "b2.pdf").write_bytes(b"%PDF-1.4\nnothing else")
+    processed = ProcessPDF('"{}" -w 2'.format(sized_corpus))
+    assert [f.filename for f in processed.files] == ["a.pdf", "b.pdf", "c.pdf"]
+    out = capsys.readouterr().out
+    assert "Reading files with 2 worker processes" in out
+    assert "b2.pdf could not be opened as a PDF file" in out
+    assert "Progress: 13 pages read" in out
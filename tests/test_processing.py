@@ -0,0 +1,32 @@
+import re
+
+import pytest
+from textblob import TextBlob
+
+from datasets_from_pdfs.readpdf import ProcessingTools
+from conftest import SENTENCES
+
+TEXTS = SENTENCES + [
+    "Teh quik brown foxx dont jump, it's \"lazy\" -- isn't it?\nNew line: 3.5 km/h.",
+    "U.S.A. e-mail (parenthetical) [brackets] ... and/or 1,000,000",
+    "",
+]
+
+
+# What both stages split out of a full TextBlob.parse() before
+def parsed(text):
+    return [token.split("/") for token in re.sub(r"\n", " ", TextBlob(text).parse()).split(" ")]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_words_split_without_tagging(text):
+    assert ProcessingTools()._tokenize(text) == [token[0] for token in parsed(text)]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_tags_match_full_parse(text):
+    tags = [
+        (token[0], token[1]) if len(token) > 1 else (token[0], None)
+        for token in parsed(text)
+    ]
+    assert ProcessingTools()._tag(text) == tags
@@ -0,0 +1,26 @@
+import pytest
+
+from datasets_from_pdfs import readpdf
+from datasets_from_pdfs.readpdf import ProcessPDF
+
+
+def untokenized(*args, **kwargs):
+    raise AssertionError("Words are split by TextBlob for a column that is not written")
+
+
+@pytest.mark.parametrize("options", ["-f pt", "-v -f pt", "-w 2 -f pt"])
+def test_progress_counts_without_tokenizing(text_corpus, no_tesseract, monkeypatch, capsys, options):
+    monkeypatch.setattr(readpdf, "TextBlob", untokenized)
+    processed = ProcessPDF('"{}" {}'.format(text_corpus, options))
+    processed.write()
+    assert processed.word_count_progress > 0
+    assert "({} words)".format(processed.word_count_progress) in capsys.readouterr().out
+
+
+def test_progress_counts_match_word_count_column(text_corpus, no_tesseract, capsys):
+    processed = ProcessPDF('"{}" -v'.format(text_corpus))
+    out = capsys.readouterr().out
+    for f in processed.files:
+        for page in f.pages:
+            assert page.word_count_progress == page.word_count
+    assert "({} words)".format(processed.word_count) in out
@@ -0,0 +1,36 @@
+import pytest
+
+from datasets_from_pdfs.readpdf import FrequencyReport, MergedFrequencyReport
+from conftest import SENTENCES
+
+
+@pytest.mark.parametrize("options", ["-r", "-r -rs", "-r -rl 5", "-r -rl 40%"])
+def test_merged_report_matches_whole_text(options):
+    reports = [FrequencyReport(sentence, options) for sentence in SENTENCES]
+    merged = MergedFrequencyReport(reports, **reports[0].args)
+    whole = FrequencyReport(" ".join(SENTENCES), options)
+    assert merged.counts == whole.counts
+    assert list(merged.report.items()) == list(whole.report.items())
+
+
+# The limit applies to the total, not to each report that is added up
+def test_merged_report_limited_once():
+    reports = [FrequencyReport(sentence, "-r -rl 1") for sentence in SENTENCES]
+    merged = MergedFrequencyReport(reports, **reports[0].args)
+    assert sum(merged.counts.values()) == sum(
+        sum(report.counts.values()) for report in reports
+    )
+    assert len(merged.report) < sum(len(report.report) for report in reports)
+
+
+def test_merged_report_of_nothing():
+    merged = MergedFrequencyReport([], **FrequencyReport("", "-r").args)
+    assert merged.report == dict()
+    assert len(merged.counts) == 0
+
+
+def test_pos_pairs_counted_in_order():
+    tags = [("the", "DT"), ("dog", "NN"), ("the", "DT"), ("dogs", "NNS"), ("the", "DT")]
+    assert list(FrequencyReport._count_POS(tags).items()) == [
+        (("the", "DT"), 3), (("dog", "NN"), 1), (("dogs", "NNS"), 1)
+    ]
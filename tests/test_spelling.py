@@ -0,0 +1,80 @@
+import os
+import random
+import string
+
+import pytest
+from textblob.en import Spelling
+
+from datasets_from_pdfs.readpdf import SpellingIndex, SQLiteCache
+from conftest import PACKAGE_DIR
+
+
+# A slice of the reference dictionary, which is quicker to index than all of it
+@pytest.fixture(scope="module")
+def dictionary(tmp_path_factory):
+    path = tmp_path_factory.mktemp("spelling") / "dictionary.txt"
+    reference_path = os.path.join(PACKAGE_DIR, "options", "Dictionary.txt")
+    with open(reference_path) as reference, open(str(path), "w") as dictionary_file:
+        for i, line in enumerate(reference):
+            if i % 10 == 0:
+                dictionary_file.write(line)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def index(dictionary):
+    return SpellingIndex(dictionary)
+
+
+def misspell(word, edits, rng):
+    for _ in range(edits):
+        i = rng.randrange(len(word) + 1)
+        edit = rng.choice(["delete", "insert", "replace", "transpose"])
+        letter = rng.choice(string.ascii_lowercase)
+        if edit == "delete" and len(word) > 1 and i < len(word):
+            word = word[:i] + word[i + 1:]
+        elif edit == "insert":
+            word = word[:i] + letter + word[i:]
+        elif edit == "replace" and i < len(word):
+            word = word[:i] + letter + word[i + 1:]
+        elif edit == "transpose" and i < len(word) - 1:
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+
+def test_suggestions_match_textblob(index, dictionary):
+    spelling = Spelling(path=dictionary)
+    rng = random.Random(0)
+    words = sorted(index.words)
+    samples = [misspell(rng.choice(words), rng.choice([0, 1, 2]), rng) for _ in range(100)]
+    samples += ["a", "qzxv", "don't", "Paris", "x1", "abcdefghij"]
+    for word in samples:
+        assert index.suggest(word) == spelling.suggest(word), word
+
+
+def test_corrections_remembered_across_runs(dictionary, tmp_path):
+    cache_path = str(tmp_path / "corrections.db")
+    first = SpellingIndex(dictionary)
+    first.cache = SQLiteCache(cache_path, "corrections", 1024 * 1024)
+    correction = first.correct("teh")
+    assert first.correct("teh") == correction
+    assert (first.memo_hits, first.memo_misses) == (1, 1)
+    first.cache.flush()
+    second = SpellingIndex(dictionary)
+    second.cache = SQLiteCache(cache_path, "corrections", 1024 * 1024)
+    second.suggest = lambda word: pytest.fail("A cached correction was suggested again")
+    assert second.correct("teh") == correction
+
+
+def test_corrections_not_shared_between_dictionaries(dictionary, tmp_path):
+    cache_path = str(tmp_path / "corrections.db")
+    first = SpellingIndex(dictionary)
+    first.cache = SQLiteCache(cache_path, "corrections", 1024 * 1024)
+    first.correct("teh")
+    first.cache.flush()
+    other_path = tmp_path / "other.txt"
+    other_path.write_text("ten 5\nthe 1\n")
+    other = SpellingIndex(str(other_path))
+    other.cache = SQLiteCache(cache_path, "corrections", 1024 * 1024)
+    assert other.correct("teh") == other.suggest("teh")[0]
+    assert other.cache.misses == 1
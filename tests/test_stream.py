@@ -0,0 +1,78 @@
+import csv
+
+import pytest
+
+from datasets_from_pdfs.readpdf import ProcessPDF
+from conftest import make_text_pdf
+
+
+def run(corpus, options):
+    processed = ProcessPDF('"{}" -q {}'.format(corpus, options))
+    processed.write()
+    return processed
+
+
+def read_output(corpus, suffix=""):
+    with open("{}{}.csv".format(corpus, suffix), newline="") as output_file:
+        return list(csv.reader(output_file))
+
+
+@pytest.fixture
+def uneven_corpus(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    # The first file is the largest, so the files after it finish ahead of it
+    make_text_pdf(corpus / "a.pdf", 12)
+    for name in ["b", "c", "d"]:
+        make_text_pdf(corpus / "{}.pdf".format(name), 1)
+    return corpus
+
+
+@pytest.mark.parametrize("options", ["-r", "-rf", "-rp"])
+def test_stream_matches_whole_run(text_corpus, no_tesseract, options):
+    run(text_corpus, options)
+    content = read_output(text_corpus)
+    report = read_output(text_corpus, "-FR")
+    run(text_corpus, options + " -sw")
+    assert read_output(text_corpus) == content
+    assert read_output(text_corpus, "-FR") == report
+
+
+def test_stream_releases_page_data(text_corpus, no_tesseract):
+    processed = run(text_corpus, "-sw -r -ac -c")
+    assert len(processed.report.report) > 0
+    for f in processed.files:
+        assert not hasattr(f, "report")
+        for page in f.pages:
+            assert page.released
+            assert page.corrected_words == []
+            assert not hasattr(page, "report")
+
+
+def test_stream_keeps_reports_that_are_written(text_corpus, no_tesseract):
+    processed = run(text_corpus, "-sw -rf")
+    assert all(len(f.report.counts) > 0 for f in processed.files)
+    processed = run(text_corpus, "-sw -rp")
+    for f in processed.files:
+        assert all(len(page.report.counts) > 0 for page in f.pages)
+
+
+def test_stream_pool_writes_in_order(uneven_corpus, no_tesseract):
+    run(uneven_corpus, "-r")
+    content = read_output(uneven_corpus)
+    report = read_output(uneven_corpus, "-FR")
+    processed = run(uneven_corpus, "-r -sw -w 3 -wc 0")
+    assert read_output(uneven_corpus) == content
+    assert read_output(uneven_corpus, "-FR") == report
+    assert all(f.released for f in processed.files)
+
+
+@pytest.mark.parametrize("options", ["-r", "-rp"])
+def test_stream_split_writes_each_report(text_corpus, no_tesseract, options):
+    outputs = [text_corpus / "one", text_corpus / "two", text_corpus / "sub" / "three"]
+    run(text_corpus, "-s " + options)
+    content = [read_output(path) for path in outputs]
+    reports = [read_output(path, "-FR") for path in outputs]
+    run(text_corpus, "-s -sw " + options)
+    assert [read_output(path) for path in outputs] == content
+    assert [read_output(path, "-FR") for path in outputs] == reports
@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+from datasets_from_pdfs.readpdf import ProcessPDF, ProgressOutput, Tracer
+
+
+def span(name, duration):
+    return (name, 0.0, duration, 1, 1, {})
+
+
+def test_summary_by_stage():
+    spans = [span("read_page", t / 1000) for t in range(1, 101)] + [span("clean_text", 0.5)]
+    rows = Tracer.summarize(spans)
+    assert [row["name"] for row in rows] == ["read_page", "clean_text"]
+    assert rows[0]["count"] == 100
+    assert rows[0]["total"] == pytest.approx(5.05)
+    assert (rows[0]["p50"], rows[0]["p90"], rows[0]["p99"], rows[0]["max"]) == (0.05, 0.09, 0.099, 0.1)
+    assert rows[1]["p99"] == 0.5
+
+
+@pytest.mark.parametrize("options", ["", "-w 2"])
+def test_trace_written_for_every_page(text_corpus, no_tesseract, capsys, options):
+    path = str(text_corpus) + "-trace.json"
+    processed = ProcessPDF('"{}" {} -tr'.format(text_corpus, options))
+    processed.write()
+    assert not Tracer.enabled
+    assert "The trace of every stage was saved to {}".format(path) in capsys.readouterr().out
+    with open(path) as trace_file:
+        events = json.load(trace_file)["traceEvents"]
+    pages = {
+        (event["args"]["file"], event["args"]["page"])
+        for event in events if event["name"] == "read_page"
+    }
+    assert len(pages) == 6
+    assert any(event["name"] == "write_content" for event in events)
+    # Spans from the worker processes are named after their process
+    processes = [event["args"]["name"] for event in events if event["name"] == "process_name"]
+    assert "main" in processes
+    assert any(name.startswith("worker") for name in processes) == bool(options)
+    assert all(event["ts"] >= 0 for event in events if event["ph"] == "X")
+
+
+def test_slowest_files_match_their_pages(text_corpus, no_tesseract, monkeypatch):
+    summaries = list()
+    monkeypatch.setattr(
+        ProgressOutput, "trace_summary", lambda self, rows, pages, files, path: summaries.append(files)
+    )
+    processed = ProcessPDF('"{}" -q -r -tr'.format(text_corpus))
+    processed.write()
+    times = {f.filename: sum(page.time for page in f.pages) for f in processed.files}
+    assert sorted(filename for file_time, filename in summaries[0]) == sorted(times)
+    for file_time, filename in summaries[0]:
+        assert file_time == pytest.approx(times[filename])
+
+
+def test_nothing_traced_without_option(text_corpus, no_tesseract):
+    ProcessPDF('"{}" -q'.format(text_corpus)).write()
+    assert Tracer.spans == list()
+    assert not os.path.exists(str(text_corpus) + "-trace.json")
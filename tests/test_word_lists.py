@@ -0,0 +1,50 @@
+import nltk
+import pytest
+
+from datasets_from_pdfs.readpdf import WordListMatcher, FrequencyReport, Arguments
+
+
+def test_only_groups_matches_by_list_order():
+    matcher = WordListMatcher(["fox", "qu\\w+", "lazy dog"])
+    assert matcher.only("The quick fox and the quiet lazy dog, fox").split() == [
+        "fox", "fox", "quick", "quiet", "lazy", "dog"
+    ]
+
+
+def test_ignore_removes_words_and_patterns():
+    matcher = WordListMatcher(["the", "l\\w+"])
+    assert matcher.ignore("The lazy dog likes the park").split() == ["dog", "park"]
+
+
+def test_backreferences_keep_their_own_groups():
+    matcher = WordListMatcher(["cat", "(\\w)\\1\\w*"])
+    assert matcher.only("aardvark cat book llama dog").split() == ["cat", "aardvark", "llama"]
+    assert matcher.ignore("aardvark cat book llama dog").split() == ["book", "dog"]
+    assert matcher.contains("llama")
+    assert not matcher.contains("book")
+
+
+def test_contains_matches_whole_words_only():
+    matcher = WordListMatcher(["fox", "qu\\w+"])
+    assert matcher.contains("fox")
+    assert matcher.contains("quick")
+    assert not matcher.contains("foxes")
+    assert not matcher.contains("squid")
+
+
+def _tagger_available():
+    try:
+        nltk.data.find("taggers/averaged_perceptron_tagger")
+        return True
+    except LookupError:
+        return False
+
+
+@pytest.mark.skipif(not _tagger_available(), reason="NLTK tagger data is not installed")
+def test_pos_report_tags_whole_text_before_word_lists():
+    text = "The dog runs. A fast dog runs far."
+    args = Arguments('"DEFAULT" -r -rpos -ro dog runs').args
+    report = FrequencyReport(text, **args)
+    tagged = FrequencyReport(text, **Arguments('"DEFAULT" -r -rpos').args)
+    expected = {key : count for key, count in tagged.counts.items() if key[0] in ["dog", "runs"]}
+    assert dict(report.counts) == expected